@@ -1,6 +1,10 @@
 import os
-import requests
+import asyncio
+import aiohttp
 import pandas as pd
+from http_cache import HttpCache, CachedSession, OfflineCacheMiss
+from rcsb_metadata import fetch_entry_metadata
+from uniprot_records import UNIPROT_FIELDS, fetch_uniprot_records, sequence_length
 
 # ============================================================
 # Configuration Variables (Edit these as needed)
@@ -9,81 +13,89 @@ import pandas as pd
 BASE_DIR = os.path.join(os.getcwd(), "data")
 OUTPUT_FILENAME = "df_receptor_HO-1.csv"
 OUTPUT_PATH = os.path.join(BASE_DIR, OUTPUT_FILENAME)
-# ============================================================
+HTTP_CACHE_PATH = os.path.join(BASE_DIR, "http_cache.sqlite")  # UniProt/RCSB response cache shared with 3_generate_ligand_df.py
+OFFLINE_MODE = False  # True = answer every request from HTTP_CACHE_PATH only (no network); a request not cached stops the run
+CONCURRENT_TASKS_LIMIT = 10  # Connections (and accession lookups) in flight at once
+TIMEOUT = 30  # Seconds per request
 
-def get_uniprot_sequence_length(accession):
-    """
-    Fetch the protein sequence from UniProt in FASTA format and return its length.
-    """
-    uniprot_url = f"https://www.uniprot.org/uniprot/{accession}.fasta"
-    try:
-        response = requests.get(uniprot_url, timeout=10)
-        if response.status_code == 200:
-            fasta_data = response.text
-            # Skip the header (first line) and join the remaining lines
-            sequence = "".join(fasta_data.splitlines()[1:])
-            return len(sequence)
-        else:
-            print(f"Failed to fetch UniProt FASTA data for {accession}, Status code: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"Error fetching UniProt FASTA data for {accession}: {e}")
-        return None
+# Base URLs for external APIs
+UNIPROT_JSON_BASE_URL = "https://rest.uniprot.org/uniprotkb"
+RCSB_QUERY_URL = "https://search.rcsb.org/rcsbsearch/v2/query"
+# ============================================================
 
 # Define the two UniProt accession codes
 uniprot_accessions = ["P09601", "A0A7I2V3I1"]
 
 # Define DataFrame columns including the new "sequence_length" column before "positions"
 columns = [
-    "protein_name", "short_name", "gene_symbol", "gene_ID", "accession", 
+    "protein_name", "short_name", "gene_symbol", "gene_ID", "accession",
     "pfam_ID", "identifier", "method", "resolution", "chain", "sequence_length", "positions"
 ]
-df = pd.DataFrame(columns=columns)
-
-# Loop over each UniProt accession
-for uniprot_accession in uniprot_accessions:
-    # Retrieve protein info from the UniProt REST API
-    uniprot_url = f"https://rest.uniprot.org/uniprotkb/{uniprot_accession}?format=json"
-    uniprot_response = requests.get(uniprot_url)
-    if uniprot_response.status_code == 200:
-        uniprot_data = uniprot_response.json()
-        
-        # Extract full protein name and short name from the recommendedName field
-        protein_description = uniprot_data.get("proteinDescription", {})
-        recommended_name = protein_description.get("recommendedName", {})
-        protein_name = recommended_name.get("fullName", {}).get("value", "N/A")
-        short_names = recommended_name.get("shortNames", [])
-        short_name = short_names[0]["value"] if short_names else "N/A"
-        
-        # Extract gene symbol from the "genes" field
-        genes = uniprot_data.get("genes", [])
-        gene_symbol = genes[0].get("geneName", {}).get("value", "N/A") if genes else "N/A"
-        
-        # Extract Ensembl gene ID and Pfam IDs from the cross-references
-        ensembl_gene_id = "N/A"
-        pfam_ids = []
-        cross_refs = uniprot_data.get("uniProtKBCrossReferences", [])
-        for ref in cross_refs:
-            if ref.get("database") == "Ensembl":
-                for prop in ref.get("properties", []):
-                    if prop.get("key") == "gene":
-                        ensembl_gene_id = prop.get("value")
-                        break
-                if ensembl_gene_id == "N/A":
-                    ensembl_gene_id = ref.get("id", "N/A")
-            if ref.get("database") == "Pfam":
-                pfam_ids.append(ref.get("id"))
-        pfam_ids = ", ".join(pfam_ids) if pfam_ids else "N/A"
-    else:
-        protein_name = "N/A"
-        short_name = "N/A"
-        gene_symbol = "N/A"
-        ensembl_gene_id = "N/A"
-        pfam_ids = "N/A"
-    
-    # Get the sequence length from the UniProt FASTA file
-    sequence_length = get_uniprot_sequence_length(uniprot_accession)
-    
+
+def receptor_fields(accession, uniprot_data):
+    """Output fields shared by all rows of one accession, from its UniProt JSON record (or N/A)."""
+    if uniprot_data is None:
+        return {
+            "protein_name": "N/A",
+            "short_name": "N/A",
+            "gene_symbol": "N/A",
+            "gene_ID": "N/A",
+            "accession": accession,
+            "pfam_ID": "N/A"
+        }
+
+    # Extract full protein name and short name from the recommendedName field
+    protein_description = uniprot_data.get("proteinDescription", {})
+    recommended_name = protein_description.get("recommendedName", {})
+    protein_name = recommended_name.get("fullName", {}).get("value", "N/A")
+    short_names = recommended_name.get("shortNames", [])
+    short_name = short_names[0]["value"] if short_names else "N/A"
+
+    # Extract gene symbol from the "genes" field
+    genes = uniprot_data.get("genes", [])
+    gene_symbol = genes[0].get("geneName", {}).get("value", "N/A") if genes else "N/A"
+
+    # Extract Ensembl gene ID and Pfam IDs from the cross-references
+    ensembl_gene_id = "N/A"
+    pfam_ids = []
+    cross_refs = uniprot_data.get("uniProtKBCrossReferences", [])
+    for ref in cross_refs:
+        if ref.get("database") == "Ensembl":
+            for prop in ref.get("properties", []):
+                if prop.get("key") == "gene":
+                    ensembl_gene_id = prop.get("value")
+                    break
+            if ensembl_gene_id == "N/A":
+                ensembl_gene_id = ref.get("id", "N/A")
+        if ref.get("database") == "Pfam":
+            pfam_ids.append(ref.get("id"))
+    pfam_ids = ", ".join(pfam_ids) if pfam_ids else "N/A"
+
+    return {
+        "protein_name": protein_name,
+        "short_name": short_name,
+        "gene_symbol": gene_symbol,
+        "gene_ID": ensembl_gene_id,
+        "accession": accession,
+        "pfam_ID": pfam_ids
+    }
+
+async def get_uniprot_json_data(accession, session):
+    """Fetch the UniProt JSON record of one accession (fallback for the bulk fetch)."""
+    url = f"{UNIPROT_JSON_BASE_URL}/{accession}?format=json&fields={UNIPROT_FIELDS}"
+    try:
+        async with session.get(url, timeout=TIMEOUT) as response:
+            if response.status == 200:
+                return await response.json()
+            print(f"Failed to fetch JSON data for {accession}, Status code: {response.status}")
+    except OfflineCacheMiss:
+        raise
+    except Exception as e:
+        print(f"Error fetching JSON data for {accession}: {e}")
+    return None
+
+async def search_pdb_ids(session, accession):
+    """PDB IDs of the experimental structures RCSB maps to a UniProt accession."""
     # Build the JSON query to get PDB IDs for experimental structures from RCSB
     query = {
         "query": {
@@ -96,7 +108,7 @@ for uniprot_accession in uniprot_accessions:
                     "parameters": {
                         "attribute": "rcsb_polymer_entity_container_identifiers.reference_sequence_identifiers.database_accession",
                         "operator": "exact_match",
-                        "value": uniprot_accession
+                        "value": accession
                     }
                 },
                 {
@@ -113,77 +125,113 @@ for uniprot_accession in uniprot_accessions:
         "return_type": "entry",
         "request_options": {"return_all_hits": True}
     }
-    
-    # URL for the RCSB search API
-    rcsb_url = "https://search.rcsb.org/rcsbsearch/v2/query"
-    
-    # Send the POST request to RCSB
-    response = requests.post(rcsb_url, json=query)
-    if response.status_code == 200:
-        results = response.json()
-        pdb_ids = [entry["identifier"] for entry in results.get("result_set", [])]
-    
-        # Process experimental structures for this accession
-        for pdb_id in pdb_ids:
-            pdb_url = f"https://data.rcsb.org/rest/v1/core/entry/{pdb_id}"
-            pdb_response = requests.get(pdb_url)
-            if pdb_response.status_code == 200:
-                pdb_data = pdb_response.json()
-                method = pdb_data.get("rcsb_entry_info", {}).get("experimental_method", "N/A")
-                resolution = pdb_data.get("rcsb_entry_info", {}).get("resolution_combined", ["N/A"])[0]
-                if resolution != "N/A":
-                    resolution = f"{resolution} Å"
-    
-                polymer_entities = pdb_data.get("rcsb_entry_container_identifiers", {}).get("polymer_entity_ids", [])
-                for entity_id in polymer_entities:
-                    entity_url = f"https://data.rcsb.org/rest/v1/core/polymer_entity/{pdb_id}/{entity_id}"
-                    entity_response = requests.get(entity_url)
-                    if entity_response.status_code == 200:
-                        entity_data = entity_response.json()
-                        chain = "/".join(entity_data.get("rcsb_polymer_entity_container_identifiers", {}).get("auth_asym_ids", []))
-                        seq = entity_data.get("entity_poly", {}).get("pdbx_seq_one_letter_code_can", "N/A")
-                        positions_range = f"1-{len(seq)}" if seq != "N/A" else "N/A"
-    
-                        new_row = pd.DataFrame({
-                            "protein_name": [protein_name],
-                            "short_name": [short_name],
-                            "gene_symbol": [gene_symbol],
-                            "gene_ID": [ensembl_gene_id],
-                            "accession": [uniprot_accession],
-                            "pfam_ID": [pfam_ids],
-                            "identifier": [pdb_id],
-                            "method": [method],
-                            "resolution": [resolution],
-                            "chain": [chain],
-                            "sequence_length": [sequence_length],
-                            "positions": [positions_range]
-                        })
-                        df = pd.concat([df, new_row], ignore_index=True)
-    else:
-        print(f"Error {response.status_code}: {response.text}")
-    
+
+    try:
+        async with session.post(RCSB_QUERY_URL, json=query, timeout=TIMEOUT) as response:
+            if response.status != 200:
+                print(f"Error {response.status}: {await response.text()}")
+                return []
+            results = await response.json()
+    except OfflineCacheMiss:
+        # A cache miss is not "no structures": stop instead of writing rows without them
+        raise
+    except Exception as e:
+        print(f"Error querying RCSB for {accession}: {e}")
+        return []
+    return [entry["identifier"] for entry in results.get("result_set", [])]
+
+async def lookup_receptor(semaphore, session, accession, uniprot_records):
+    """
+    UniProt fields, sequence length and PDB IDs of one accession. The UniProt record
+    comes from the bulk fetch when possible; the structure metadata is fetched later
+    for all accessions at once (see generate_receptor_table).
+    """
+    async with semaphore:
+        uniprot_data = uniprot_records.get(accession)
+        if uniprot_data is None:
+            # Not returned by the bulk request: fetch the record on its own
+            uniprot_data = await get_uniprot_json_data(accession, session)
+        pdb_ids = await search_pdb_ids(session, accession)
+    return {
+        "fields": receptor_fields(accession, uniprot_data),
+        # The sequence length is part of the UniProt record (no separate FASTA request)
+        "sequence_length": sequence_length(uniprot_data),
+        "pdb_ids": pdb_ids
+    }
+
+def build_receptor_rows(receptor, entry_metadata):
+    """Rows of one accession: one per polymer entity of each PDB entry, then the AlphaFold model."""
+    rows = []
+    seq_length = receptor["sequence_length"]
+    for pdb_id in receptor["pdb_ids"]:
+        entry = entry_metadata.get(pdb_id.upper())
+        if entry is None:
+            continue
+        resolution = entry["resolution"]
+        if resolution != "N/A":
+            resolution = f"{resolution} Å"
+
+        for entity in entry["entities"]:
+            seq = entity["sequence"]
+            rows.append(dict(
+                receptor["fields"],
+                identifier=pdb_id,
+                method=entry["method"],
+                resolution=resolution,
+                chain="/".join(entity["chains"]),
+                sequence_length=seq_length,
+                positions=f"1-{len(seq)}" if seq != "N/A" else "N/A"
+            ))
+
     # Add the AlphaFold predicted structure row for this accession
-    alphafold_id = f"AF-{uniprot_accession}-F1"
-    alphafold_method = "Predicted"
-    new_row_af = pd.DataFrame({
-        "protein_name": [protein_name],
-        "short_name": [short_name],
-        "gene_symbol": [gene_symbol],
-        "gene_ID": [ensembl_gene_id],
-        "accession": [uniprot_accession],
-        "pfam_ID": [pfam_ids],
-        "identifier": [alphafold_id],
-        "method": [alphafold_method],
-        "resolution": [""],
-        "chain": [""],
-        "sequence_length": [sequence_length],
-        "positions": [""]
-    })
-    df = pd.concat([df, new_row_af], ignore_index=True)
-
-# Display the final DataFrame
-print(df)
-
-# Save the DataFrame to CSV using the dynamically generated output path
-df.to_csv(OUTPUT_PATH, index=False)
-print(f"Data saved to {OUTPUT_PATH}")
+    rows.append(dict(
+        receptor["fields"],
+        identifier=f"AF-{receptor['fields']['accession']}-F1",
+        method="Predicted",
+        resolution="",
+        chain="",
+        sequence_length=seq_length,
+        positions=""
+    ))
+    return rows
+
+async def generate_receptor_table(accessions, concurrency=CONCURRENT_TASKS_LIMIT, cache_path=HTTP_CACHE_PATH,
+                                  offline=OFFLINE_MODE):
+    """
+    Build the receptor table of a list of UniProt accessions: UniProt records in bulk,
+    one RCSB search per accession and the metadata of all PDB entries in batched
+    requests, all over one pool of `concurrency` connections (and through the
+    response cache at cache_path, unless None). Rows keep the order of accessions.
+    """
+    cache = HttpCache(cache_path, offline=offline) if cache_path else None
+    try:
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector) as client:
+            session = CachedSession(client, cache) if cache else client
+            uniprot_records = await fetch_uniprot_records(session, accessions, concurrency=concurrency)
+            semaphore = asyncio.Semaphore(concurrency)
+            receptors = await asyncio.gather(
+                *(lookup_receptor(semaphore, session, accession, uniprot_records) for accession in accessions)
+            )
+
+            # Method, resolution, chains and sequence of all structures (each entry fetched once)
+            pdb_ids = [pdb_id for receptor in receptors for pdb_id in receptor["pdb_ids"]]
+            entry_metadata = await fetch_entry_metadata(session, pdb_ids, concurrency=concurrency)
+    finally:
+        if cache:
+            print(f"HTTP cache: {cache.hits} hits, {cache.misses} misses")
+            cache.close()
+
+    # Rows are collected first and the DataFrame is built once
+    rows = [row for receptor in receptors for row in build_receptor_rows(receptor, entry_metadata)]
+    return pd.DataFrame(rows, columns=columns)
+
+if __name__ == "__main__":
+    df = asyncio.run(generate_receptor_table(uniprot_accessions))
+
+    # Display the final DataFrame
+    print(df)
+
+    # Save the DataFrame to CSV using the dynamically generated output path
+    df.to_csv(OUTPUT_PATH, index=False)
+    print(f"Data saved to {OUTPUT_PATH}")
@@ -1,6 +1,6 @@
 import os
-import requests
 import pandas as pd
+from structure_fetch import fetch_structures
 
 # ============================================================
 # Configuration Variables (Edit these as needed)
@@ -10,44 +10,21 @@ BASE_DIR = os.path.join(os.getcwd(), "data")
 RCSB_PDB_DIR = os.path.join(BASE_DIR, 'receptor_pdbs')
 ALPHAFOLD_PDB_DIR = os.path.join(BASE_DIR, 'receptor_pdbs')  # You can change this if you want a separate folder
 INPUT_CSV_FILE = os.path.join(BASE_DIR, "df_receptor_HO-1.csv")
-RCSB_DOWNLOAD_BASE_URL = "https://files.rcsb.org/download/"
-ALPHAFOLD_DOWNLOAD_BASE_URL = "https://alphafold.ebi.ac.uk/files/"
+# Compressed, deduplicated structures shared with 4_filter_and_download_ligand_pdbs.py; None = plain files only
+STRUCTURE_STORE_DIR = os.path.join(BASE_DIR, "structure_store")
+# Download URLs, local mirrors, per-host limits and retries are set in structure_fetch.py
 # ============================================================
 
-os.makedirs(RCSB_PDB_DIR, exist_ok=True)
-os.makedirs(ALPHAFOLD_PDB_DIR, exist_ok=True)
-
-def download_rcsb_pdb(identifier, output_directory):
-    pdb_url = f"{RCSB_DOWNLOAD_BASE_URL}{identifier}.pdb"
-    try:
-        response = requests.get(pdb_url, timeout=10)
-        response.raise_for_status()
-        pdb_file_path = os.path.join(output_directory, f"{identifier}.pdb")
-        with open(pdb_file_path, 'wb') as pdb_file:
-            pdb_file.write(response.content)
-        print(f"Downloaded (RCSB): {identifier}.pdb")
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to download {identifier} from RCSB: {e}")
-
 df_receptor_hmox1 = pd.read_csv(INPUT_CSV_FILE)
-pdb_ids = df_receptor_hmox1.loc[~df_receptor_hmox1['identifier'].str.startswith("AF-"), 'identifier'].tolist()
-
-for pdb_id in pdb_ids:
-    download_rcsb_pdb(pdb_id, RCSB_PDB_DIR)
+identifiers = df_receptor_hmox1['identifier'].tolist()
 
-def download_alphafold_pdb(identifier, output_directory):
-    pdb_url = f"{ALPHAFOLD_DOWNLOAD_BASE_URL}{identifier}-model_v4.pdb"
-    try:
-        response = requests.get(pdb_url, timeout=10)
-        response.raise_for_status()
-        pdb_file_path = os.path.join(output_directory, f"{identifier}.pdb")
-        with open(pdb_file_path, 'wb') as pdb_file:
-            pdb_file.write(response.content)
-        print(f"Downloaded (AlphaFold): {identifier}.pdb")
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to download {identifier} from AlphaFold: {e}")
+# RCSB entries and AlphaFold models are downloaded together over one connection pool
+downloads = [
+    (identifier, ALPHAFOLD_PDB_DIR if identifier.startswith("AF-") else RCSB_PDB_DIR)
+    for identifier in identifiers
+]
+results = fetch_structures(downloads, store_dir=STRUCTURE_STORE_DIR)
 
-for _, row in df_receptor_hmox1.iterrows():
-    identifier = row['identifier']
-    if identifier.startswith("AF-"):
-        download_alphafold_pdb(identifier, ALPHAFOLD_PDB_DIR)
+failed = [identifier for identifier, success, _ in results if not success]
+if failed:
+    print(f"Failed to download {len(failed)} structures: {', '.join(failed)}")
@@ -5,6 +5,9 @@ import aiohttp
 import pandas as pd
 import warnings
 import unicodedata  # To normalize Unicode characters
+from http_cache import HttpCache, CachedSession, OfflineCacheMiss
+from rcsb_metadata import fetch_entry_metadata
+from uniprot_records import UNIPROT_FIELDS, fetch_uniprot_records, sequence_length
 
 # ============================================================
 # Configuration Variables (Edit these as needed)
@@ -13,13 +16,13 @@ LIGAND_EXCEL_FILE_PATH = os.path.join(os.getcwd(), "data", "list_75_proteins.xls
 OUTPUT_CSV_FILE_PATH = os.path.join(os.getcwd(), "data", "df_all_ligands.csv")
 CONCURRENT_TASKS_LIMIT = 10
 TIMEOUT = 10  # Seconds
+HTTP_CACHE_PATH = os.path.join(os.getcwd(), "data", "http_cache.sqlite")  # UniProt/RCSB response cache; None = no cache
+OFFLINE_MODE = False  # True = answer every request from HTTP_CACHE_PATH only (no network); a request not cached stops the run
+UNIPROT_BULK = True  # Fetch the UniProt records of many accessions per request (stream endpoint)
 
 # Base URLs for external APIs
-UNIPROT_FASTA_BASE_URL = "https://www.uniprot.org/uniprot"
 UNIPROT_JSON_BASE_URL = "https://rest.uniprot.org/uniprotkb"
 RCSB_QUERY_URL = "https://search.rcsb.org/rcsbsearch/v2/query"
-RCSB_ENTRY_BASE_URL = "https://data.rcsb.org/rest/v1/core/entry"
-RCSB_POLYMER_ENTITY_BASE_URL = "https://data.rcsb.org/rest/v1/core/polymer_entity"
 # ============================================================
 
 # (Optional) Suppress openpyxl conditional formatting warning
@@ -35,26 +38,9 @@ ligand_df['Accession'] = ligand_df['Accession'].str.replace(r'-1$', '', regex=Tr
 # -----------------------------
 # Step 2. Define async functions to fetch UniProt data
 # -----------------------------
-async def get_uniprot_sequence(accession, session):
-    """Fetch the protein sequence in FASTA format and return its length."""
-    uniprot_url = f"{UNIPROT_FASTA_BASE_URL}/{accession}.fasta"
-    try:
-        async with session.get(uniprot_url, timeout=TIMEOUT) as response:
-            if response.status == 200:
-                fasta_data = await response.text()
-                # Skip header and join the remaining lines
-                sequence = "".join(fasta_data.splitlines()[1:])
-                return len(sequence)
-            else:
-                print(f"Failed to fetch FASTA for {accession}, Status code: {response.status}")
-                return None
-    except Exception as e:
-        print(f"Error fetching FASTA for {accession}: {e}")
-        return None
-
 async def get_uniprot_json_data(accession, session):
-    """Fetch the UniProt JSON data for additional protein details."""
-    url = f"{UNIPROT_JSON_BASE_URL}/{accession}?format=json"
+    """Fetch the UniProt JSON data (names, genes, cross-references and sequence length)."""
+    url = f"{UNIPROT_JSON_BASE_URL}/{accession}?format=json&fields={UNIPROT_FIELDS}"
     try:
         async with session.get(url, timeout=TIMEOUT) as response:
             if response.status == 200:
@@ -62,15 +48,28 @@ async def get_uniprot_json_data(accession, session):
             else:
                 print(f"Failed to fetch JSON data for {accession}, Status code: {response.status}")
                 return None
+    except OfflineCacheMiss:
+        raise
     except Exception as e:
         print(f"Error fetching JSON data for {accession}: {e}")
         return None
 
 # -----------------------------
-# Step 3. Define an async function to process one ligand
+# Step 3. Define async functions to look up one ligand and build its rows
 # -----------------------------
-async def process_ligand(session, row):
-    results_list = []
+def _no_structure_row(ligand, identifier="no_pdb"):
+    """Result row for a ligand without usable experimental structures."""
+    return dict(ligand["fields"], identifier=identifier, method="N/A", resolution="N/A", chain="N/A",
+                sequence_length=ligand["sequence_length"], positions="N/A")
+
+async def lookup_ligand(session, row, uniprot_records=None):
+    """
+    Fetch the UniProt data of one ligand (unless it is in uniprot_records, from a
+    bulk fetch) and search RCSB for its experimental structures.
+    Returns a ligand record: the shared output fields, the sequence length and the
+    valid PDB IDs (empty when RCSB has none); the structure metadata is fetched later
+    for all ligands at once (see fetch_ligand_structures).
+    """
     # Use ligand_df values as defaults
     accession = row["Accession"]
     # Preserve the full gene symbol string from the CSV
@@ -80,28 +79,24 @@ async def process_ligand(session, row):
 
     print(f"Processing {accession}...")
 
-    # Get sequence length
-    seq_length = await get_uniprot_sequence(accession, session)
+    # The UniProt JSON record holds the sequence length as well as the names
+    uniprot_json = (uniprot_records or {}).get(accession)
+    if uniprot_json is None:
+        uniprot_json = await get_uniprot_json_data(accession, session)
+    seq_length = sequence_length(uniprot_json)
     if seq_length is None:
-        # Without sequence length, add a result row with N/A
-        results_list.append({
+        # Without sequence length, the ligand only gets a result row with N/A
+        fields = {
             "protein_name": "N/A",
             "short_name": "N/A",
             "gene_symbol": input_gene_symbol,
             "gene_ID": ensembl_gene_id,
             "accession": accession,
-            "pfam_ID": pfam_ids,
-            "identifier": "N/A",
-            "method": "N/A",
-            "resolution": "N/A",
-            "chain": "N/A",
-            "sequence_length": "N/A",
-            "positions": "N/A"
-        })
-        return results_list
+            "pfam_ID": pfam_ids
+        }
+        return {"fields": fields, "sequence_length": None, "pdb_ids": []}
 
-    # Get UniProt JSON data to fetch protein_name and short_name (and update gene_symbol if available)
-    uniprot_json = await get_uniprot_json_data(accession, session)
+    # Use the UniProt JSON data to fetch protein_name and short_name (and update gene_symbol if available)
     if uniprot_json:
         protein_description = uniprot_json.get("proteinDescription", {})
         recommended_name = protein_description.get("recommendedName", {})
@@ -140,6 +135,19 @@ async def process_ligand(session, row):
         short_name = "N/A"
         gene_symbol = input_gene_symbol
 
+    ligand = {
+        "fields": {
+            "protein_name": protein_name,
+            "short_name": short_name,
+            "gene_symbol": gene_symbol,
+            "gene_ID": ensembl_gene_id,
+            "accession": accession,
+            "pfam_ID": pfam_ids
+        },
+        "sequence_length": seq_length,
+        "pdb_ids": []
+    }
+
     # Build the JSON query for experimental structures from RCSB
     query = {
         "query": {
@@ -171,172 +179,126 @@ async def process_ligand(session, row):
     }
     # Use the configured RCSB query URL
     rcsb_query_url = RCSB_QUERY_URL
-    
+
     try:
         async with session.post(rcsb_query_url, json=query, timeout=TIMEOUT) as response:
             text = await response.text()
             if not text.strip():
                 print(f"Empty response for accession {accession}. Skipping experimental structures.")
-                # Add a row for RCSB with N/A values; using "no_pdb" now instead of "rcsb"
-                results_list.append({
-                    "protein_name": protein_name,
-                    "short_name": short_name,
-                    "gene_symbol": gene_symbol,
-                    "gene_ID": ensembl_gene_id,
-                    "accession": accession,
-                    "pfam_ID": pfam_ids,
-                    "identifier": "no_pdb",
-                    "method": "N/A",
-                    "resolution": "N/A",
-                    "chain": "N/A",
-                    "sequence_length": seq_length,
-                    "positions": "N/A"
-                })
-            else:
-                result = await response.json()
-                # For each entry, normalize the identifier and only accept if it exactly matches 4 alphanumeric characters.
-                pdb_ids = []
-                for entry in result.get("result_set", []):
-                    raw_id = entry["identifier"]
-                    normalized = unicodedata.normalize("NFKC", raw_id).strip()
-                    # Remove all whitespace (including non-breaking spaces) from within the identifier.
-                    normalized_no_space = re.sub(r"\s+", "", normalized)
-                    if re.fullmatch(r"[A-Za-z0-9]{4}", normalized_no_space):
-                        pdb_ids.append(normalized_no_space.upper())
-
-                if not pdb_ids:
-                    print(f"No valid PDB IDs found for {accession}.")
-                    results_list.append({
-                        "protein_name": protein_name,
-                        "short_name": short_name,
-                        "gene_symbol": gene_symbol,
-                        "gene_ID": ensembl_gene_id,
-                        "accession": accession,
-                        "pfam_ID": pfam_ids,
-                        "identifier": "no_pdb",
-                        "method": "N/A",
-                        "resolution": "N/A",
-                        "chain": "N/A",
-                        "sequence_length": seq_length,
-                        "positions": "N/A"
-                    })
-                else:
-                    # Process each experimental structure
-                    for pdb_id in pdb_ids:
-                        pdb_url = f"{RCSB_ENTRY_BASE_URL}/{pdb_id}"
-                        try:
-                            async with session.get(pdb_url, timeout=TIMEOUT) as pdb_response:
-                                pdb_data = await pdb_response.json()
-                                method = pdb_data.get("rcsb_entry_info", {}).get("experimental_method", "N/A")
-                                resolution_list = pdb_data.get("rcsb_entry_info", {}).get("resolution_combined", ["N/A"])
-                                resolution = resolution_list[0]
-                                if resolution != "N/A":
-                                    resolution = f"{resolution} Å"
-
-                                polymer_entities = pdb_data.get("rcsb_entry_container_identifiers", {}).get("polymer_entity_ids", [])
-                                all_chains = []
-                                for entity_id in polymer_entities:
-                                    entity_url = f"{RCSB_POLYMER_ENTITY_BASE_URL}/{pdb_id}/{entity_id}"
-                                    try:
-                                        async with session.get(entity_url, timeout=TIMEOUT) as entity_response:
-                                            entity_data = await entity_response.json()
-                                            chain_list = entity_data.get("rcsb_polymer_entity_container_identifiers", {}).get("auth_asym_ids", [])
-                                            if chain_list:
-                                                all_chains.extend(chain_list)
-                                    except Exception as e:
-                                        print(f"Error fetching polymer entity {entity_id} for {pdb_id}: {e}")
-                                        continue
-                                chain = "/".join(all_chains) if all_chains else "N/A"
-                                positions_range = f"1-{seq_length}"
-                                
-                                results_list.append({
-                                    "protein_name": protein_name,
-                                    "short_name": short_name,
-                                    "gene_symbol": gene_symbol,
-                                    "gene_ID": ensembl_gene_id,
-                                    "accession": accession,
-                                    "pfam_ID": pfam_ids,
-                                    "identifier": pdb_id,
-                                    "method": method,
-                                    "resolution": resolution,
-                                    "chain": chain,
-                                    "sequence_length": seq_length,
-                                    "positions": positions_range
-                                })
-                        except Exception as e:
-                            print(f"Error fetching PDB details for {pdb_id}: {e}")
-                            continue
+                return ligand
+            result = await response.json()
+        # For each entry, normalize the identifier and only accept if it exactly matches 4 alphanumeric characters.
+        pdb_ids = []
+        for entry in result.get("result_set", []):
+            raw_id = entry["identifier"]
+            normalized = unicodedata.normalize("NFKC", raw_id).strip()
+            # Remove all whitespace (including non-breaking spaces) from within the identifier.
+            normalized_no_space = re.sub(r"\s+", "", normalized)
+            if re.fullmatch(r"[A-Za-z0-9]{4}", normalized_no_space):
+                pdb_ids.append(normalized_no_space.upper())
+    except OfflineCacheMiss:
+        # A cache miss is not "no structures": stop instead of writing a no_pdb row
+        raise
     except Exception as e:
         print(f"Error querying RCSB for {accession}: {e}")
-        results_list.append({
-            "protein_name": protein_name,
-            "short_name": short_name,
-            "gene_symbol": gene_symbol,
-            "gene_ID": ensembl_gene_id,
-            "accession": accession,
-            "pfam_ID": pfam_ids,
-            "identifier": "no_pdb",
-            "method": "N/A",
-            "resolution": "N/A",
-            "chain": "N/A",
-            "sequence_length": seq_length,
-            "positions": "N/A"
-        })
+        return ligand
+
+    ligand["pdb_ids"] = pdb_ids
+
+    if not ligand["pdb_ids"]:
+        print(f"No valid PDB IDs found for {accession}.")
+    return ligand
+
+def build_ligand_rows(ligand, entry_metadata):
+    """Result rows of one ligand record, given the metadata of its PDB entries (rcsb_metadata)."""
+    if ligand["sequence_length"] is None:
+        return [dict(_no_structure_row(ligand, identifier="N/A"), sequence_length="N/A")]
+
+    results_list = []
+    seq_length = ligand["sequence_length"]
+    for pdb_id in ligand["pdb_ids"]:
+        entry = entry_metadata.get(pdb_id)
+        if entry is None:
+            print(f"Error fetching PDB details for {pdb_id}: not returned by RCSB")
+            continue
+        resolution = entry["resolution"]
+        if resolution != "N/A":
+            resolution = f"{resolution} Å"
+        all_chains = [chain_id for entity in entry["entities"] for chain_id in entity["chains"]]
+        chain = "/".join(all_chains) if all_chains else "N/A"
+        positions_range = f"1-{seq_length}"
+
+        results_list.append(dict(
+            ligand["fields"],
+            identifier=pdb_id,
+            method=entry["method"],
+            resolution=resolution,
+            chain=chain,
+            sequence_length=seq_length,
+            positions=positions_range
+        ))
+
+    # Ligands without any usable experimental structure keep a "no_pdb" row
+    if not ligand["pdb_ids"]:
+        results_list.append(_no_structure_row(ligand))
 
     # Add the AlphaFold predicted structure row for this accession
-    alphafold_id = f"AF-{accession}-F1"
-    try:
-        results_list.append({
-            "protein_name": protein_name,
-            "short_name": short_name,
-            "gene_symbol": gene_symbol,
-            "gene_ID": ensembl_gene_id,
-            "accession": accession,
-            "pfam_ID": pfam_ids,
-            "identifier": alphafold_id,
-            "method": "Predicted",
-            "resolution": "",
-            "chain": "",
-            "sequence_length": seq_length,
-            "positions": ""
-        })
-    except Exception as e:
-        print(f"Error adding AlphaFold structure for {accession}: {e}")
-        results_list.append({
-            "protein_name": protein_name,
-            "short_name": short_name,
-            "gene_symbol": gene_symbol,
-            "gene_ID": ensembl_gene_id,
-            "accession": accession,
-            "pfam_ID": pfam_ids,
-            "identifier": "alphafold",
-            "method": "N/A",
-            "resolution": "N/A",
-            "chain": "N/A",
-            "sequence_length": seq_length,
-            "positions": "N/A"
-        })
-    
+    alphafold_id = f"AF-{ligand['fields']['accession']}-F1"
+    results_list.append(dict(
+        ligand["fields"],
+        identifier=alphafold_id,
+        method="Predicted",
+        resolution="",
+        chain="",
+        sequence_length=seq_length,
+        positions=""
+    ))
     return results_list
 
 # -----------------------------
-# Wrap process_ligand with a semaphore to limit concurrent tasks
+# Wrap lookup_ligand with a semaphore to limit concurrent lookups
 # -----------------------------
-async def sem_process_ligand(semaphore, session, row):
+async def sem_lookup_ligand(semaphore, session, row, uniprot_records=None):
     async with semaphore:
-        return await process_ligand(session, row)
+        return await lookup_ligand(session, row, uniprot_records)
 
 # -----------------------------
 # Step 4. Process all ligands concurrently
 # -----------------------------
 async def fetch_ligand_structures():
+    """
+    Look up all ligands concurrently, then fetch the metadata of every PDB entry they
+    reference in one flat set of batched requests, so a ligand with hundreds of
+    structures no longer forms a serial tail. All requests share one connection pool
+    of CONCURRENT_TASKS_LIMIT connections; rows keep the spreadsheet order.
+    """
     all_results = []
     semaphore = asyncio.Semaphore(CONCURRENT_TASKS_LIMIT)
-    async with aiohttp.ClientSession() as session:
-        tasks = [sem_process_ligand(semaphore, session, row) for _, row in ligand_df.iterrows()]
-        ligands_results = await asyncio.gather(*tasks)
-        for result in ligands_results:
-            all_results.extend(result)
+    cache = HttpCache(HTTP_CACHE_PATH, offline=OFFLINE_MODE) if HTTP_CACHE_PATH else None
+    try:
+        connector = aiohttp.TCPConnector(limit=CONCURRENT_TASKS_LIMIT)
+        async with aiohttp.ClientSession(connector=connector) as client:
+            # UniProt and RCSB requests are answered from the cache when possible
+            session = CachedSession(client, cache) if cache else client
+            uniprot_records = None
+            if UNIPROT_BULK:
+                # Many accessions per request; any accession missing from the result is fetched on its own
+                uniprot_records = await fetch_uniprot_records(
+                    session, ligand_df["Accession"].dropna().tolist(), concurrency=CONCURRENT_TASKS_LIMIT
+                )
+            tasks = [sem_lookup_ligand(semaphore, session, row, uniprot_records) for _, row in ligand_df.iterrows()]
+            ligands = await asyncio.gather(*tasks)
+
+            # One pool of metadata batches over the entries of all ligands (each entry fetched once)
+            pdb_ids = [pdb_id for ligand in ligands for pdb_id in ligand["pdb_ids"]]
+            entry_metadata = await fetch_entry_metadata(session, pdb_ids, concurrency=CONCURRENT_TASKS_LIMIT)
+
+            for ligand in ligands:
+                all_results.extend(build_ligand_rows(ligand, entry_metadata))
+    finally:
+        if cache:
+            print(f"HTTP cache: {cache.hits} hits, {cache.misses} misses")
+            cache.close()
     return all_results
 
 # -----------------------------
@@ -0,0 +1,97 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from structure_selection import select_structures
+
+# ============================================================
+# Configuration Variables
+# ============================================================
+N_ROWS = 100000       # Rows of the synthetic df_all_ligands.csv
+N_ACCESSIONS = 5000   # Distinct accessions (about 20 structures each)
+SEED = 0
+# ============================================================
+
+def parse_position_length(position):
+    """Calculate length from Positions string (e.g., '1-98')."""
+    if pd.isna(position) or position == 'N/A':
+        return 0
+    try:
+        start, end = map(int, position.split('-'))
+        return end - start + 1
+    except (ValueError, AttributeError):
+        return 0
+
+def filter_ligand_structures_loop(ligand_df):
+    """The selection used by 4_filter_and_download_ligand_pdbs.py before structure_selection existed."""
+    filtered_results = []
+    for accession, group in ligand_df.groupby("accession"):
+        predicted = group[group['method'].str.contains('predicted', case=False, na=False)]
+        others = group[~group.index.isin(predicted.index)]
+        selected = predicted.copy()
+        if len(selected) < 3:
+            others = others.copy()
+            others["position_length"] = others["positions"].apply(parse_position_length)
+            others = others.sort_values(by=["position_length", "resolution"], ascending=[False, True])
+            selected = pd.concat([selected, others.head(3 - len(selected))])
+        filtered_results.append(selected.head(3))
+    return pd.concat(filtered_results).reset_index(drop=True).fillna('N/A')
+
+def synthetic_ligands(n_rows, n_accessions, rng, max_resolution):
+    """A df_all_ligands.csv-like table: experimental rows, 'no_pdb' rows and one AlphaFold row per accession."""
+    accessions = np.array([f"Q{i:05d}" for i in range(n_accessions)])
+    n_experimental = n_rows - n_accessions
+    lengths = rng.choice([98, 120, 120, 250, 250, 250, 400], size=n_experimental)
+    resolution = np.round(rng.uniform(0.8, max_resolution, size=n_experimental), 1)
+    experimental = pd.DataFrame({
+        "accession": rng.choice(accessions, size=n_experimental),
+        "identifier": [f"{i:04X}" for i in rng.integers(0, 16 ** 4, size=n_experimental)],
+        "method": rng.choice(["X-ray diffraction", "Electron Microscopy", "Solution NMR"], size=n_experimental),
+        "resolution": [f"{r} Å" for r in resolution],
+        "positions": [f"1-{n}" for n in lengths],
+    })
+    no_pdb = rng.random(n_experimental) < 0.02
+    experimental.loc[no_pdb, ["identifier", "method", "resolution", "positions"]] = ["no_pdb", "N/A", "N/A", "N/A"]
+    predicted = pd.DataFrame({
+        "accession": accessions,
+        "identifier": [f"AF-{a}-F1" for a in accessions],
+        "method": "Predicted",
+        "resolution": "",
+        "positions": "",
+    })
+    return pd.concat([experimental, predicted], ignore_index=True).sample(frac=1, random_state=SEED)
+
+def read_as_csv(df, tmp_dir):
+    """Round-trip through CSV so the columns look exactly like a read of df_all_ligands.csv."""
+    path = os.path.join(tmp_dir, "df_all_ligands.csv")
+    df.to_csv(path, index=False)
+    return pd.read_csv(path)
+
+def timed(select, df):
+    start = time.perf_counter()
+    result = select(df)
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(SEED)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Below 10 Å the string order of resolutions equals the numeric one, so both must agree exactly
+        parity_df = read_as_csv(synthetic_ligands(N_ROWS, N_ACCESSIONS, rng, max_resolution=9.9), tmp_dir)
+        if not filter_ligand_structures_loop(parity_df).equals(select_structures(parity_df)):
+            raise SystemExit("Selections differ on resolutions below 10 Å")
+
+        df = read_as_csv(synthetic_ligands(N_ROWS, N_ACCESSIONS, rng, max_resolution=20.0), tmp_dir)
+
+    loop_result, t_loop = timed(filter_ligand_structures_loop, df)
+    vector_result, t_vector = timed(select_structures, df)
+    changed = (
+        loop_result.groupby("accession")["identifier"].apply(tuple)
+        != vector_result.groupby("accession")["identifier"].apply(tuple)
+    ).sum()
+
+    print(f"Rows: {len(df)} ({df['accession'].nunique()} accessions)")
+    print(f"groupby loop:        {t_loop:.3f} s")
+    print(f"select_structures:   {t_vector:.3f} s")
+    print(f"Speed-up: {t_loop / t_vector:.1f}x")
+    print(f"Accessions whose picks change with numeric resolution order: {changed}")
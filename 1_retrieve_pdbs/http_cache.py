@@ -0,0 +1,174 @@
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+from urllib.parse import urlsplit
+
+# ============================================================
+# Cache Settings
+# ============================================================
+DAY = 24 * 3600
+# Seconds a cached response stays fresh, per API host
+ENDPOINT_TTLS = {
+    "rest.uniprot.org": 30 * DAY,   # UniProt records change with the monthly releases
+    "www.uniprot.org": 30 * DAY,
+    "search.rcsb.org": 1 * DAY,     # New PDB entries are released weekly
+    "data.rcsb.org": 7 * DAY,
+}
+DEFAULT_TTL = 1 * DAY
+MAX_CACHE_BYTES = 2 * 1024 ** 3  # Least recently used responses are evicted above this size
+CACHEABLE_STATUSES = (200, 204)  # RCSB search answers 204 when nothing matches
+# ============================================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+class OfflineCacheMiss(Exception):
+    """A request in offline mode that the cache cannot answer."""
+
+    def __init__(self, method, url):
+        super().__init__(f"{method} {url} is not in the HTTP cache (offline mode)")
+        self.method = method
+        self.url = url
+
+class HttpCache:
+    """
+    On-disk (SQLite) cache of successful HTTP responses, keyed by method, URL and
+    JSON payload. Entries expire after the TTL of their host (ENDPOINT_TTLS) and the
+    least recently used ones are evicted once the bodies exceed max_bytes.
+    In offline mode nothing is fetched: cached entries are served even if expired
+    and misses raise OfflineCacheMiss.
+    """
+
+    def __init__(self, path, ttls=None, max_bytes=MAX_CACHE_BYTES, offline=False):
+        self.path = path
+        self.ttls = dict(ENDPOINT_TTLS if ttls is None else ttls)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(method, url, payload=None):
+        """Cache key of a request (the JSON payload is serialized with sorted keys)."""
+        payload_text = json.dumps(payload, sort_keys=True, separators=(",", ":")) if payload is not None else ""
+        return hashlib.sha256(f"{method.upper()} {url}\n{payload_text}".encode("utf-8")).hexdigest()
+
+    def ttl_for(self, url):
+        """Freshness lifetime in seconds of responses from url's host."""
+        return self.ttls.get(urlsplit(url).netloc, DEFAULT_TTL)
+
+    def get(self, method, url, payload=None):
+        """Return (status, body) of a fresh cached response, or None."""
+        key = self.key(method, url, payload)
+        found = self._conn.execute("SELECT status, body, stored FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if found is None or (not self.offline and now - found[2] > self.ttl_for(url)):
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return found[0], zlib.decompress(found[1])
+
+    def put(self, method, url, payload, status, body):
+        """Store a response body (compressed) and evict old entries if the cache is too large."""
+        key = self.key(method, url, payload)
+        compressed = zlib.compress(body)
+        now = time.time()
+        previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, url, status, compressed, len(compressed), now, now)
+        )
+        self._total_bytes += len(compressed) - (previous[0] if previous else 0)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is back under 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def close(self):
+        self._conn.close()
+
+class CachedResponse:
+    """The parts of an HTTP response the scripts use, for cached and fresh responses alike."""
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+    async def text(self):
+        return self.body.decode("utf-8", errors="replace")
+
+    async def json(self):
+        return json.loads(self.body)
+
+class _CachedRequest:
+    """Async context manager returned by CachedSession.get/post."""
+
+    def __init__(self, session, cache, method, url, payload, kwargs):
+        self._session = session
+        self._cache = cache
+        self._method = method
+        self._url = url
+        self._payload = payload
+        self._kwargs = kwargs
+
+    async def __aenter__(self):
+        cached = self._cache.get(self._method, self._url, self._payload)
+        if cached is not None:
+            return CachedResponse(*cached)
+        if self._cache.offline:
+            # Not an empty response: callers would take it for "no results"
+            raise OfflineCacheMiss(self._method, self._url)
+        async with self._session.request(self._method, self._url, json=self._payload, **self._kwargs) as response:
+            body = await response.read()
+        # Only successful responses are cached; errors are retried on the next run
+        if response.status in CACHEABLE_STATUSES:
+            self._cache.put(self._method, self._url, self._payload, response.status, body)
+        return CachedResponse(response.status, body)
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class CachedSession:
+    """
+    Wrap an aiohttp.ClientSession so that get/post go through an HttpCache.
+    Used as `async with session.get(url, timeout=...) as response:` like the session itself.
+    """
+
+    def __init__(self, session, cache):
+        self.session = session
+        self.cache = cache
+
+    def get(self, url, **kwargs):
+        return _CachedRequest(self.session, self.cache, "GET", url, None, kwargs)
+
+    def post(self, url, json=None, **kwargs):
+        return _CachedRequest(self.session, self.cache, "POST", url, json, kwargs)
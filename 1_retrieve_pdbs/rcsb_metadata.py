@@ -0,0 +1,105 @@
+import asyncio
+from http_cache import OfflineCacheMiss
+
+# ============================================================
+# Configuration Variables
+# ============================================================
+RCSB_GRAPHQL_URL = "https://data.rcsb.org/graphql"
+ENTRY_BATCH_SIZE = 200  # PDB entries (with all their polymer entities) per GraphQL request
+CONCURRENT_BATCHES = 4  # Batch requests in flight at once
+TIMEOUT = 30  # Seconds per batch request
+# ============================================================
+
+# One request returns, for every entry, the fields that used to take one /core/entry
+# request per entry plus one /core/polymer_entity request per entity
+ENTRY_METADATA_QUERY = """
+query EntryMetadata($ids: [String!]!) {
+  entries(entry_ids: $ids) {
+    rcsb_id
+    rcsb_entry_info {
+      experimental_method
+      resolution_combined
+    }
+    rcsb_entry_container_identifiers {
+      polymer_entity_ids
+    }
+    polymer_entities {
+      rcsb_polymer_entity_container_identifiers {
+        entity_id
+        auth_asym_ids
+      }
+      entity_poly {
+        pdbx_seq_one_letter_code_can
+      }
+    }
+  }
+}
+"""
+
+def parse_entry(entry):
+    """
+    Turn one GraphQL entry into {"method", "resolution", "entities"}, with entities
+    [{"entity_id", "chains", "sequence"}] in the entry's polymer_entity_ids order.
+    Missing values are "N/A" as in the REST documents.
+    """
+    info = entry.get("rcsb_entry_info") or {}
+    method = info.get("experimental_method") or "N/A"
+    resolution = (info.get("resolution_combined") or ["N/A"])[0]
+
+    entities = {}
+    for entity in entry.get("polymer_entities") or []:
+        identifiers = entity.get("rcsb_polymer_entity_container_identifiers") or {}
+        entities[identifiers.get("entity_id")] = {
+            "entity_id": identifiers.get("entity_id"),
+            "chains": identifiers.get("auth_asym_ids") or [],
+            "sequence": (entity.get("entity_poly") or {}).get("pdbx_seq_one_letter_code_can") or "N/A",
+        }
+    entity_ids = (entry.get("rcsb_entry_container_identifiers") or {}).get("polymer_entity_ids") or sorted(
+        (entity_id for entity_id in entities if entity_id is not None), key=lambda x: (len(x), x)
+    )
+    return {
+        "method": method,
+        "resolution": resolution,
+        "entities": [entities[entity_id] for entity_id in entity_ids if entity_id in entities],
+    }
+
+async def fetch_entry_batch(session, pdb_ids, timeout=TIMEOUT):
+    """Fetch the metadata of up to ENTRY_BATCH_SIZE entries in one GraphQL request."""
+    payload = {"query": ENTRY_METADATA_QUERY, "variables": {"ids": list(pdb_ids)}}
+    try:
+        async with session.post(RCSB_GRAPHQL_URL, json=payload, timeout=timeout) as response:
+            if response.status != 200:
+                print(f"Failed to fetch metadata for {len(pdb_ids)} PDB entries, Status code: {response.status}")
+                return {}
+            result = await response.json()
+    except OfflineCacheMiss:
+        raise
+    except Exception as e:
+        print(f"Error fetching metadata for {len(pdb_ids)} PDB entries: {e}")
+        return {}
+
+    for error in result.get("errors") or []:
+        print(f"RCSB GraphQL error: {error.get('message', error)}")
+    entries = (result.get("data") or {}).get("entries") or []
+    return {entry["rcsb_id"].upper(): parse_entry(entry) for entry in entries if entry and entry.get("rcsb_id")}
+
+async def fetch_entry_metadata(session, pdb_ids, batch_size=ENTRY_BATCH_SIZE, timeout=TIMEOUT,
+                               concurrency=CONCURRENT_BATCHES):
+    """
+    Return {PDB ID: metadata} (see parse_entry) for pdb_ids, fetched in batches of
+    batch_size entries with at most `concurrency` batches in flight on session.
+    Entries RCSB does not return (or whose batch failed) are missing from the result.
+    """
+    unique_ids = list(dict.fromkeys(pdb_id.upper() for pdb_id in pdb_ids))
+    batches = [unique_ids[i:i + batch_size] for i in range(0, len(unique_ids), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(batch):
+        # Bounded here so queued batches do not spend their timeout waiting for a connection
+        async with semaphore:
+            return await fetch_entry_batch(session, batch, timeout)
+
+    metadata = {}
+    for batch_metadata in await asyncio.gather(*(fetch(batch) for batch in batches)):
+        metadata.update(batch_metadata)
+    return metadata
@@ -0,0 +1,178 @@
+import os
+import gzip
+import zlib
+import shutil
+import asyncio
+import aiohttp
+from urllib.parse import urlsplit
+from structure_store import StructureStore
+
+# ============================================================
+# Configuration Variables
+# ============================================================
+RCSB_DOWNLOAD_BASE_URL = "https://files.rcsb.org/download/"
+ALPHAFOLD_DOWNLOAD_BASE_URL = "https://alphafold.ebi.ac.uk/files/"
+ALPHAFOLD_MODEL_VERSION = "v4"
+# Downloads in flight at once per host (hosts not listed get DEFAULT_HOST_LIMIT)
+HOST_LIMITS = {
+    "files.rcsb.org": 8,
+    "alphafold.ebi.ac.uk": 8,
+}
+DEFAULT_HOST_LIMIT = 4
+TOTAL_CONNECTIONS = 16       # Connection pool size shared by all hosts
+CHUNK_SIZE = 256 * 1024      # Bytes read from the socket per write
+CONNECT_TIMEOUT = 15         # Seconds to establish a connection
+READ_TIMEOUT = 60            # Seconds without receiving any data before giving up
+MAX_ATTEMPTS = 4             # Attempts per file
+BACKOFF = 1.0                # Seconds before the first retry, doubled for each further one
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Local mirrors, checked before any download (empty = always download)
+PDB_MIRROR_ROOTS = []        # Divided PDB layout: '<root>/xx/pdbXXXX.ent.gz', e.g. '/mirror/pdb/data/structures/divided/pdb'
+ALPHAFOLD_MIRROR_ROOTS = []  # AlphaFold dump folders holding 'AF-<accession>-F1-model_v4.pdb(.gz)'
+HTTP_FALLBACK = True         # False = use the mirrors only (air-gapped nodes: fail fast instead of timing out)
+# ============================================================
+
+def structure_url(identifier):
+    """Download URL of a structure: AlphaFold model for 'AF-...' identifiers, else the RCSB entry."""
+    if identifier.startswith("AF-"):
+        return f"{ALPHAFOLD_DOWNLOAD_BASE_URL}{identifier}-model_{ALPHAFOLD_MODEL_VERSION}.pdb"
+    return f"{RCSB_DOWNLOAD_BASE_URL}{identifier}.pdb"
+
+def mirror_candidates(identifier):
+    """Paths a structure may have in the configured local mirrors, in lookup order."""
+    if identifier.startswith("AF-"):
+        name = f"{identifier}-model_{ALPHAFOLD_MODEL_VERSION}.pdb"
+        return [os.path.join(root, name + suffix) for root in ALPHAFOLD_MIRROR_ROOTS for suffix in (".gz", "")]
+    pdb_id = identifier.lower()
+    return [os.path.join(root, pdb_id[1:3], f"pdb{pdb_id}.ent.gz") for root in PDB_MIRROR_ROOTS]
+
+def find_in_mirror(identifier):
+    """Path of a structure in the local mirrors, or None if no mirror holds it."""
+    for path in mirror_candidates(identifier):
+        if os.path.isfile(path):
+            return path
+    return None
+
+def copy_from_mirror(mirror_path, dest_path):
+    """Copy (decompressing .gz) a mirrored structure to dest_path through a .part file."""
+    part_path = f"{dest_path}.part"
+    try:
+        opener = gzip.open if mirror_path.endswith(".gz") else open
+        with opener(mirror_path, "rb") as src, open(part_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        os.replace(part_path, dest_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+def structure_path(identifier, output_dir):
+    """Local path of a structure: '<output_dir>/<identifier>.pdb'."""
+    return os.path.join(output_dir, f"{identifier}.pdb")
+
+async def fetch_structure(session, host_limits, identifier, output_dir, store=None,
+                          max_attempts=MAX_ATTEMPTS, backoff=BACKOFF):
+    """
+    Place one structure in output_dir unless it is already there: linked from the
+    structure store if it holds the identifier, else copied from a local mirror,
+    else downloaded. New files are added to the store (when one is given).
+    Returns (success, message).
+    """
+    dest_path = structure_path(identifier, output_dir)
+    loop = asyncio.get_running_loop()
+    # Store and mirror work (hashing, gzip) runs in worker threads so downloads keep streaming meanwhile
+    if os.path.exists(dest_path):
+        if store is not None and identifier not in store.index:
+            # Files from before the store existed are adopted, so the other stage can link them
+            await loop.run_in_executor(None, store.add, identifier, dest_path)
+        return True, f"Already exists: {identifier}.pdb"
+
+    if store is not None and await loop.run_in_executor(None, store.link, identifier, dest_path):
+        return True, f"Linked from store: {identifier}"
+
+    success, message = await retrieve_structure(session, host_limits, identifier, dest_path, max_attempts, backoff)
+    if success and store is not None:
+        await loop.run_in_executor(None, store.add, identifier, dest_path)
+    return success, message
+
+async def retrieve_structure(session, host_limits, identifier, dest_path, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF):
+    """
+    Copy a structure from a local mirror when one holds it, else download it
+    (HTTP only for files the mirrors lack). The body is written to '<path>.part'
+    and renamed only once complete, so an interrupted download never leaves a
+    truncated .pdb behind. Connection errors and RETRY_STATUSES are retried with
+    exponential backoff; other statuses (e.g. 404 for an obsolete entry) fail at once.
+    Returns (success, message).
+    """
+    mirror_path = find_in_mirror(identifier)
+    if mirror_path is not None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, copy_from_mirror, mirror_path, dest_path)
+            return True, f"Copied from mirror: {identifier}"
+        except (gzip.BadGzipFile, zlib.error, OSError, EOFError) as e:
+            # Corrupt deflate data raises zlib.error, which is not an OSError
+            print(f"Unreadable mirror file {mirror_path} ({type(e).__name__}: {e}), downloading {identifier} instead")
+    if not HTTP_FALLBACK:
+        return False, f"Failed {identifier}: not in the local mirrors"
+
+    url = structure_url(identifier)
+    part_path = f"{dest_path}.part"
+    last_error = "unknown error"
+    async with host_limits[urlsplit(url).netloc]:
+        for attempt in range(1, max_attempts + 1):
+            if attempt > 1:
+                await asyncio.sleep(backoff * 2 ** (attempt - 2))
+            try:
+                async with session.get(url) as response:
+                    if response.status in RETRY_STATUSES:
+                        last_error = f"HTTP {response.status}"
+                        continue
+                    if response.status != 200:
+                        return False, f"Failed {identifier}: HTTP {response.status}"
+                    with open(part_path, "wb") as f:
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            f.write(chunk)
+                os.replace(part_path, dest_path)
+                return True, f"Downloaded: {identifier}"
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            finally:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+    return False, f"Failed {identifier}: {last_error} (after {max_attempts} attempts)"
+
+async def fetch_structures_async(downloads, total_connections=TOTAL_CONNECTIONS, host_limits=None, store_dir=None):
+    """
+    Download every (identifier, output_dir) in downloads over one pooled session,
+    with at most HOST_LIMITS[host] transfers in flight per host. With store_dir,
+    files come from (and new files go into) the StructureStore there.
+    Prints one message per structure as it finishes and returns
+    [(identifier, success, message)] in the order of downloads.
+    """
+    limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+    # Each file is fetched once, even if it is listed for several rows
+    downloads = list(dict.fromkeys(downloads))
+    hosts = {urlsplit(structure_url(identifier)).netloc for identifier, _ in downloads}
+    semaphores = {host: asyncio.Semaphore(limits.get(host, DEFAULT_HOST_LIMIT)) for host in hosts}
+    for output_dir in {output_dir for _, output_dir in downloads}:
+        os.makedirs(output_dir, exist_ok=True)
+
+    store = StructureStore(store_dir) if store_dir else None
+
+    async def fetch(identifier, output_dir):
+        success, message = await fetch_structure(session, semaphores, identifier, output_dir, store)
+        print(message)
+        return identifier, success, message
+
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=total_connections)
+    try:
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            return await asyncio.gather(*(fetch(identifier, output_dir) for identifier, output_dir in downloads))
+    finally:
+        if store is not None:
+            store.save()
+
+def fetch_structures(downloads, total_connections=TOTAL_CONNECTIONS, host_limits=None, store_dir=None):
+    """Blocking entry point of fetch_structures_async for the download scripts."""
+    return asyncio.run(fetch_structures_async(downloads, total_connections, host_limits, store_dir))
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# Selection Settings
+# ============================================================
+STRUCTURES_PER_ACCESSION = 3
+# ============================================================
+
+def resolution_values(resolution):
+    """Resolution in Angstrom as floats ("1.8 Å" -> 1.8); NaN where there is no number (e.g. "N/A")."""
+    return pd.to_numeric(resolution.astype(str).str.extract(r"(\d+(?:\.\d+)?)", expand=False), errors="coerce")
+
+def position_lengths(positions):
+    """Length of each Positions range ("1-98" -> 98); 0 where the value is not a range (e.g. "N/A")."""
+    bounds = positions.astype(str).str.extract(r"^\s*(\d+)\s*-\s*(\d+)\s*$")
+    start = pd.to_numeric(bounds[0], errors="coerce")
+    end = pd.to_numeric(bounds[1], errors="coerce")
+    return (end - start + 1).fillna(0).astype(np.int64)
+
+def select_structures(ligand_df, top_n=STRUCTURES_PER_ACCESSION):
+    """
+    Pick up to top_n structures per accession: predicted models first (in file order),
+    then experimental structures by longest position range and best (lowest) numeric
+    resolution, ties kept in file order. One sort and one groupby().head() over the
+    whole table; accessions come out sorted. Adds a position_length column (N/A for
+    predicted models) and fills missing values with 'N/A'.
+    """
+    df = ligand_df.dropna(subset=["accession"])
+    predicted = df["method"].str.contains("predicted", case=False, na=False)
+    df = df.assign(position_length=position_lengths(df["positions"]).where(~predicted))
+
+    # Predicted models share constant keys so the stable sort keeps their file order
+    keys = pd.DataFrame({
+        "accession": df["accession"],
+        "predicted": predicted,
+        "length": df["position_length"].fillna(0),
+        "resolution": resolution_values(df["resolution"]).where(~predicted, 0.0),
+    }, index=df.index)
+    order = keys.sort_values(
+        by=["accession", "predicted", "length", "resolution"],
+        ascending=[True, False, False, True],
+        kind="stable",
+        na_position="last"
+    ).index
+    selected = df.loc[order].groupby("accession", sort=False).head(top_n)
+    return selected.reset_index(drop=True).fillna("N/A")
@@ -0,0 +1,217 @@
+import os
+import gzip
+import json
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# ============================================================
+# Store Settings
+# ============================================================
+LINK_MODE = "hardlink"  # How working folders get their files: "hardlink" (symlink across devices) or "symlink"
+COMPRESS_LEVEL = 6
+CHUNK_SIZE = 1024 * 1024
+SAVE_EVERY = 100  # Additions between index writes (a crash loses at most these; the files are re-adopted next run)
+# ============================================================
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def link_file(source_path, dest_path, mode=LINK_MODE):
+    """
+    Make dest_path refer to source_path: a hardlink (or a symlink to the real file in
+    "symlink" mode, or when the two are on different devices), a plain copy as last
+    resort. An existing dest_path is replaced atomically.
+    Returns the kind of link made: "hardlink", "symlink" or "copy".
+    """
+    tmp_path = f"{dest_path}.link"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        if mode != "hardlink":
+            raise OSError("symlink mode")
+        os.link(source_path, tmp_path)
+        kind = "hardlink"
+    except OSError:
+        try:
+            os.symlink(os.path.realpath(source_path), tmp_path)
+            kind = "symlink"
+        except OSError:
+            shutil.copyfile(source_path, tmp_path)
+            kind = "copy"
+    os.replace(tmp_path, dest_path)
+    return kind
+
+def _write_atomically(path, write):
+    """Call write(f) on a uniquely named temp file next to path, then rename it over path."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _copy_into(source_path, f, opener=open):
+    """Copy the content of source_path (opened with opener, e.g. gzip.open) into the file object f."""
+    with opener(source_path, "rb") as src:
+        shutil.copyfileobj(src, f, CHUNK_SIZE)
+
+class StructureStore:
+    """
+    Content-addressed store of structure files shared by the receptor and ligand stages.
+    The index maps identifiers (e.g. '1N45', 'AF-P09601-F1') to content hashes. Each
+    distinct file is stored gzip'd as 'objects/ab/<sha256>.pdb.gz' when it is added,
+    and decompressed once into a checkout ('checkouts/ab/<sha256>.pdb') that
+    receptor_pdbs, ligand_pdbs and the submission folders link to instead of holding
+    copies. Checkouts no folder links to any more are deleted by prune_checkouts and
+    decompressed again on demand.
+    """
+
+    def __init__(self, store_dir, link_mode=LINK_MODE):
+        self.store_dir = store_dir
+        self.link_mode = link_mode
+        self.index_path = os.path.join(store_dir, "index.json")
+        self._lock = threading.Lock()  # add/link also run in worker threads
+        os.makedirs(store_dir, exist_ok=True)
+        # Checkouts some working file symlinks to: their link count does not show it
+        self.index, self.symlinked = self._read_index()
+        self._removed = set()  # Identifiers dropped here, so a merge on save does not bring them back
+        self._unsaved = 0
+
+    def _read_index(self):
+        """(identifiers, symlinked checkouts) from index.json, also reading the old flat format."""
+        if not os.path.exists(self.index_path):
+            return {}, set()
+        with open(self.index_path) as f:
+            payload = json.load(f)
+        if "identifiers" in payload:
+            return payload["identifiers"], set(payload.get("symlinked", []))
+        return payload, set()
+
+    def object_path(self, sha):
+        return os.path.join(self.store_dir, "objects", sha[:2], f"{sha}.pdb.gz")
+
+    def checkout_path(self, sha):
+        return os.path.join(self.store_dir, "checkouts", sha[:2], f"{sha}.pdb")
+
+    def _link(self, sha, dest_path):
+        """Link the checkout of sha to dest_path, remembering checkouts that ended up symlinked."""
+        if link_file(self.checkout_path(sha), dest_path, self.link_mode) == "symlink":
+            self.symlinked.add(sha)
+
+    def _write_object(self, sha, source_path):
+        """Write the gzip object of sha from source_path unless it exists."""
+        object_path = self.object_path(sha)
+        if os.path.exists(object_path):
+            return
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+
+        def compress(f):
+            with open(source_path, "rb") as src, gzip.GzipFile(fileobj=f, mode="wb", compresslevel=COMPRESS_LEVEL) as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        _write_atomically(object_path, compress)
+
+    def add(self, identifier, path):
+        """
+        Store the file at path under identifier: its gzip object is written (once per
+        content), the first copy of a content becomes its checkout (hardlinked, so it
+        costs no extra space) and a file whose content is already stored is replaced
+        by a link to the existing checkout. The index is saved every SAVE_EVERY additions.
+        Returns the content hash.
+        """
+        sha = file_sha256(path)
+        checkout_path = self.checkout_path(sha)
+        with self._lock:
+            if not os.path.exists(checkout_path):
+                os.makedirs(os.path.dirname(checkout_path), exist_ok=True)
+                if link_file(path, checkout_path, "hardlink") == "symlink":
+                    # Checkout and working file on different devices: keep a real copy in the store
+                    _write_atomically(checkout_path, lambda f: _copy_into(path, f))
+                    self._link(sha, path)
+            elif not os.path.samefile(checkout_path, path):
+                # Same content already stored (e.g. fetched for the other stage): share it
+                self._link(sha, path)
+            self.index[identifier] = sha
+            self._removed.discard(identifier)
+            self._unsaved += 1
+            save_now = self._unsaved >= SAVE_EVERY
+        # Compressed outside the lock so other threads keep linking meanwhile
+        self._write_object(sha, checkout_path)
+        if save_now:
+            self.save()
+        return sha
+
+    def link(self, identifier, dest_path):
+        """
+        Populate dest_path from the store if it holds identifier (restoring the
+        checkout from the compressed object if it was pruned). Returns True on success.
+        """
+        with self._lock:
+            sha = self.index.get(identifier)
+            if sha is None:
+                return False
+            checkout_path = self.checkout_path(sha)
+            if not os.path.exists(checkout_path):
+                object_path = self.object_path(sha)
+                if not os.path.exists(object_path):
+                    del self.index[identifier]
+                    self._removed.add(identifier)
+                    return False
+                os.makedirs(os.path.dirname(checkout_path), exist_ok=True)
+                _write_atomically(checkout_path, lambda f: _copy_into(object_path, f, gzip.open))
+            self._link(sha, dest_path)
+        return True
+
+    def prune_checkouts(self):
+        """
+        Delete checkouts no working folder hardlinks to any more (link count 1); their
+        gzip object (written when they were added, or here for older stores) remains.
+        Checkouts that were ever symlinked are kept, since symlinks do not show in the
+        link count. Returns the number pruned.
+        """
+        pruned = 0
+        checkouts_dir = os.path.join(self.store_dir, "checkouts")
+        for root, _, files in os.walk(checkouts_dir):
+            for name in files:
+                sha = name[:-len(".pdb")]
+                path = os.path.join(root, name)
+                if not name.endswith(".pdb") or sha in self.symlinked or os.stat(path).st_nlink > 1:
+                    continue
+                self._write_object(sha, path)
+                os.remove(path)
+                pruned += 1
+        return pruned
+
+    def save(self):
+        """
+        Merge the identifier index (and the symlinked checkouts) into index.json and
+        write it atomically. A file lock serializes the stages saving at once, and the
+        entries another stage saved meanwhile are kept (and picked up here).
+        """
+        with self._lock, open(f"{self.index_path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            saved_index, saved_symlinked = self._read_index()
+            for identifier in self._removed:
+                saved_index.pop(identifier, None)
+            saved_index.update(self.index)
+            self.index = saved_index
+            self.symlinked |= saved_symlinked
+            payload = {"identifiers": self.index, "symlinked": sorted(self.symlinked)}
+            _write_atomically(self.index_path, lambda f: f.write(json.dumps(payload, indent=0, sort_keys=True).encode("utf-8")))
+            self._removed.clear()
+            self._unsaved = 0
+
+if __name__ == "__main__":
+    # Remove the uncompressed copies of structures no longer linked from receptor_pdbs, ligand_pdbs or the submission folders
+    store = StructureStore(os.path.join(os.getcwd(), "data", "structure_store"))
+    print(f"Removed {store.prune_checkouts()} unused checkouts from {store.store_dir}")
+    store.save()
@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+from http_cache import HttpCache, CachedSession, OfflineCacheMiss
+from rcsb_metadata import fetch_entry_metadata
+
+RCSB_SEARCH_URL = "https://search.rcsb.org/rcsbsearch/v2/query"
+
+
+@pytest.fixture
+def offline_session(tmp_path):
+    cache = HttpCache(str(tmp_path / "http_cache.sqlite"), offline=True)
+    # Offline, the wrapped aiohttp session is never used
+    yield CachedSession(None, cache)
+    cache.close()
+
+
+def test_offline_hit_is_served_even_if_expired(offline_session):
+    offline_session.cache.put("POST", RCSB_SEARCH_URL, {"q": 1}, 204, b"")
+    offline_session.cache.ttls = {"search.rcsb.org": -1}
+
+    async def post():
+        async with offline_session.post(RCSB_SEARCH_URL, json={"q": 1}) as response:
+            return response.status, await response.text()
+
+    assert asyncio.run(post()) == (204, "")
+
+
+def test_offline_miss_raises(offline_session):
+    async def post():
+        async with offline_session.post(RCSB_SEARCH_URL, json={"q": 2}) as response:
+            return await response.text()
+
+    with pytest.raises(OfflineCacheMiss):
+        asyncio.run(post())
+
+
+def test_offline_miss_is_not_an_empty_result(offline_session):
+    # Callers that turn request errors into "no entries" must let a cache miss through
+    with pytest.raises(OfflineCacheMiss):
+        asyncio.run(fetch_entry_metadata(offline_session, ["1N45"]))
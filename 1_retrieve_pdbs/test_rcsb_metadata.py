@@ -0,0 +1,90 @@
+import os
+import json
+import asyncio
+import aiohttp
+from aiohttp import web
+import rcsb_metadata
+from rcsb_metadata import fetch_entry_metadata, parse_entry
+
+with open(os.path.join(os.path.dirname(__file__), "fixtures", "rcsb_entries.json")) as f:
+    FIXTURE = json.load(f)
+RECORDED = {entry["rcsb_id"]: entry for entry in FIXTURE["graphql_entries"]}
+
+
+def run_against_stand_in(monkeypatch, pdb_ids, batch_size=rcsb_metadata.ENTRY_BATCH_SIZE):
+    """fetch_entry_metadata against a localhost GraphQL stand-in serving the recorded entries."""
+    batches = []
+
+    async def graphql(request):
+        ids = (await request.json())["variables"]["ids"]
+        batches.append(ids)
+        # Like RCSB, unknown entries come back as null
+        return web.json_response({"data": {"entries": [RECORDED.get(pdb_id) for pdb_id in ids]}})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/graphql", graphql)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        monkeypatch.setattr(rcsb_metadata, "RCSB_GRAPHQL_URL", f"http://127.0.0.1:{runner.addresses[0][1]}/graphql")
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await fetch_entry_metadata(session, pdb_ids, batch_size=batch_size)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(scenario()), batches
+
+
+def rest_fields(pdb_id):
+    """Method, resolution and per-entity (chain, sequence) as the old per-entry REST calls read them."""
+    pdb_data = FIXTURE["rest_entry"][pdb_id]
+    method = pdb_data.get("rcsb_entry_info", {}).get("experimental_method", "N/A")
+    resolution = pdb_data.get("rcsb_entry_info", {}).get("resolution_combined", ["N/A"])[0]
+    entities = []
+    for entity_id in pdb_data.get("rcsb_entry_container_identifiers", {}).get("polymer_entity_ids", []):
+        entity_data = FIXTURE["rest_polymer_entity"][f"{pdb_id}/{entity_id}"]
+        chain = "/".join(entity_data.get("rcsb_polymer_entity_container_identifiers", {}).get("auth_asym_ids", []))
+        sequence = entity_data.get("entity_poly", {}).get("pdbx_seq_one_letter_code_can", "N/A")
+        entities.append((chain, sequence))
+    return method, resolution, entities
+
+
+def test_batches_split_at_batch_size(monkeypatch):
+    pdb_ids = list(RECORDED)
+    metadata, batches = run_against_stand_in(monkeypatch, pdb_ids + ["1n45"], batch_size=2)
+    # Duplicates (in any case) are fetched once
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert sorted(pdb_id for batch in batches for pdb_id in batch) == sorted(pdb_ids)
+    assert set(metadata) == set(pdb_ids)
+
+
+def test_entries_not_returned_are_missing(monkeypatch):
+    metadata, _ = run_against_stand_in(monkeypatch, ["1N45", "0XXX"])
+    assert "1N45" in metadata
+    assert "0XXX" not in metadata
+
+
+def test_null_method_and_resolution_become_na(monkeypatch):
+    metadata, _ = run_against_stand_in(monkeypatch, ["2MAW", "7NUL"])
+    assert metadata["2MAW"]["method"] == "SOLUTION NMR"
+    assert metadata["2MAW"]["resolution"] == "N/A"
+    assert metadata["7NUL"]["method"] == "N/A"
+    assert metadata["7NUL"]["resolution"] == "N/A"
+
+
+def test_multi_entity_chains_in_entity_order(monkeypatch):
+    metadata, _ = run_against_stand_in(monkeypatch, ["6EHA"])
+    entities = metadata["6EHA"]["entities"]
+    assert [entity["entity_id"] for entity in entities] == ["1", "2", "10"]
+    assert [chain for entity in entities for chain in entity["chains"]] == ["A", "B", "C", "D", "E"]
+
+
+def test_parse_entry_matches_rest_fields():
+    for pdb_id, entry in RECORDED.items():
+        parsed = parse_entry(entry)
+        method, resolution, entities = rest_fields(pdb_id)
+        assert parsed["method"] == method
+        assert parsed["resolution"] == resolution
+        assert [("/".join(entity["chains"]), entity["sequence"]) for entity in parsed["entities"]] == entities
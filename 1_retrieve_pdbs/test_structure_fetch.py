@@ -0,0 +1,124 @@
+import os
+import gzip
+import asyncio
+import threading
+import pytest
+from aiohttp import web
+import structure_fetch
+from structure_fetch import fetch_structures
+
+PDB_TEXT = b"HEADER    OXIDOREDUCTASE\n" + b"ATOM      1  N   MET A   1      11.104  13.207   2.100  1.00 20.00           N\n" * 2000
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Localhost stand-in for files.rcsb.org; yields the list of requested paths."""
+    requested = []
+
+    async def download(request):
+        requested.append(request.path)
+        return web.Response(body=PDB_TEXT)
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/download/{name}", download)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", 0).start())
+    port = runner.addresses[0][1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(structure_fetch, "RCSB_DOWNLOAD_BASE_URL", f"http://127.0.0.1:{port}/download/")
+    monkeypatch.setattr(structure_fetch, "HOST_LIMITS", {f"127.0.0.1:{port}": 4})
+    yield requested
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def write_mirror_file(mirror_root, pdb_id, data):
+    path = os.path.join(mirror_root, pdb_id.lower()[1:3], f"pdb{pdb_id.lower()}.ent.gz")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def corrupt_deflate(data):
+    """A gzip file whose header is intact but whose deflate stream is garbage."""
+    damaged = bytearray(data)
+    damaged[20:40] = b"\xff" * 20
+    return bytes(damaged)
+
+
+@pytest.mark.parametrize("mirror_data", [
+    corrupt_deflate(gzip.compress(PDB_TEXT)),               # zlib.error
+    gzip.compress(PDB_TEXT)[:200],                          # EOFError (truncated)
+    b"not a gzip file",                                     # gzip.BadGzipFile
+], ids=["corrupt", "truncated", "not-gzip"])
+def test_unreadable_mirror_file_falls_back_to_http(server, tmp_path, monkeypatch, mirror_data):
+    mirror_root = str(tmp_path / "mirror")
+    write_mirror_file(mirror_root, "1N45", mirror_data)
+    monkeypatch.setattr(structure_fetch, "PDB_MIRROR_ROOTS", [mirror_root])
+    output_dir = str(tmp_path / "out")
+
+    results = fetch_structures([("1N45", output_dir), ("2ABC", output_dir)])
+
+    assert [(identifier, success) for identifier, success, _ in results] == [("1N45", True), ("2ABC", True)]
+    assert sorted(server) == ["/download/1N45.pdb", "/download/2ABC.pdb"]
+    with open(os.path.join(output_dir, "1N45.pdb"), "rb") as f:
+        assert f.read() == PDB_TEXT
+    assert sorted(os.listdir(output_dir)) == ["1N45.pdb", "2ABC.pdb"]
+
+
+def test_mirror_file_is_used_without_http(server, tmp_path, monkeypatch):
+    mirror_root = str(tmp_path / "mirror")
+    write_mirror_file(mirror_root, "1N45", gzip.compress(b"MIRRORED\n"))
+    monkeypatch.setattr(structure_fetch, "PDB_MIRROR_ROOTS", [mirror_root])
+    output_dir = str(tmp_path / "out")
+
+    [(_, success, message)] = fetch_structures([("1N45", output_dir)])
+
+    assert success and message == "Copied from mirror: 1N45"
+    assert server == []
+    with open(os.path.join(output_dir, "1N45.pdb"), "rb") as f:
+        assert f.read() == b"MIRRORED\n"
+
+
+def test_missing_mirror_file_is_downloaded(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(structure_fetch, "PDB_MIRROR_ROOTS", [str(tmp_path / "mirror")])
+    output_dir = str(tmp_path / "out")
+
+    [(_, success, message)] = fetch_structures([("1N45", output_dir)])
+
+    assert success and message == "Downloaded: 1N45"
+    assert server == ["/download/1N45.pdb"]
+
+
+def test_missing_mirror_file_without_http_fallback_fails(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(structure_fetch, "PDB_MIRROR_ROOTS", [str(tmp_path / "mirror")])
+    monkeypatch.setattr(structure_fetch, "HTTP_FALLBACK", False)
+    output_dir = str(tmp_path / "out")
+
+    [(_, success, message)] = fetch_structures([("1N45", output_dir)])
+
+    assert not success
+    assert message == "Failed 1N45: not in the local mirrors"
+    assert server == []
+    assert os.listdir(output_dir) == []
+
+
+def test_existing_files_are_adopted_by_the_store(server, tmp_path):
+    receptor_dir = str(tmp_path / "receptor_pdbs")
+    ligand_dir = str(tmp_path / "ligand_pdbs")
+    store_dir = str(tmp_path / "store")
+    os.makedirs(receptor_dir)
+    with open(os.path.join(receptor_dir, "1N45.pdb"), "wb") as f:
+        f.write(PDB_TEXT)
+
+    # A receptor folder from before the store existed, then the ligand stage
+    fetch_structures([("1N45", receptor_dir)], store_dir=store_dir)
+    [(_, success, message)] = fetch_structures([("1N45", ligand_dir)], store_dir=store_dir)
+
+    assert success and message == "Linked from store: 1N45"
+    assert server == []
+    assert os.path.samefile(os.path.join(receptor_dir, "1N45.pdb"), os.path.join(ligand_dir, "1N45.pdb"))
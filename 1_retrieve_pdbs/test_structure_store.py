@@ -0,0 +1,98 @@
+import os
+from structure_store import StructureStore
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_shared_structure_is_stored_once(tmp_path):
+    store = StructureStore(str(tmp_path / "store"))
+    receptor_file = str(tmp_path / "receptor_pdbs" / "1N45.pdb")
+    write(receptor_file, b"ATOM 1N45\n")
+    sha = store.add("1N45", receptor_file)
+
+    ligand_file = str(tmp_path / "ligand_pdbs" / "1N45.pdb")
+    os.makedirs(os.path.dirname(ligand_file))
+    assert store.link("1N45", ligand_file)
+
+    assert os.path.samefile(receptor_file, ligand_file)
+    assert os.path.samefile(receptor_file, store.checkout_path(sha))
+    # The gzip object is written at ingest
+    assert os.path.exists(store.object_path(sha))
+
+
+def test_prune_compresses_unused_checkouts_and_link_restores_them(tmp_path):
+    store = StructureStore(str(tmp_path / "store"))
+    working_file = str(tmp_path / "ligand_pdbs" / "AF-P09601-F1.pdb")
+    write(working_file, b"ATOM AF\n" * 100)
+    sha = store.add("AF-P09601-F1", working_file)
+
+    assert store.prune_checkouts() == 0
+    os.remove(working_file)
+    assert store.prune_checkouts() == 1
+    assert not os.path.exists(store.checkout_path(sha))
+    assert os.path.exists(store.object_path(sha))
+
+    assert store.link("AF-P09601-F1", working_file)
+    with open(working_file, "rb") as f:
+        assert f.read() == b"ATOM AF\n" * 100
+
+
+def test_prune_keeps_symlinked_checkouts(tmp_path):
+    store_dir = str(tmp_path / "store")
+    store = StructureStore(store_dir, link_mode="symlink")
+    receptor_file = str(tmp_path / "receptor_pdbs" / "1N45.pdb")
+    write(receptor_file, b"ATOM 1N45\n")
+    sha = store.add("1N45", receptor_file)
+    ligand_file = str(tmp_path / "ligand_pdbs" / "1N45.pdb")
+    os.makedirs(os.path.dirname(ligand_file))
+    store.link("1N45", ligand_file)
+    store.save()
+    os.remove(receptor_file)
+
+    # A fresh store reads the symlinked checkouts back from the index
+    assert StructureStore(store_dir).prune_checkouts() == 0
+    assert os.path.islink(ligand_file)
+    assert os.path.exists(store.checkout_path(sha))
+    with open(ligand_file, "rb") as f:
+        assert f.read() == b"ATOM 1N45\n"
+
+
+def test_old_index_format_is_read(tmp_path):
+    store_dir = str(tmp_path / "store")
+    write(os.path.join(store_dir, "index.json"), b'{"1N45": "ab"}')
+    assert StructureStore(store_dir).index == {"1N45": "ab"}
+
+
+def test_stores_saving_at_once_keep_each_others_entries(tmp_path):
+    store_dir = str(tmp_path / "store")
+    receptor_store = StructureStore(store_dir)
+    ligand_store = StructureStore(store_dir)
+    receptor_file = str(tmp_path / "receptor_pdbs" / "1N45.pdb")
+    ligand_file = str(tmp_path / "ligand_pdbs" / "1XJZ.pdb")
+    write(receptor_file, b"ATOM 1N45\n")
+    write(ligand_file, b"ATOM 1XJZ\n")
+
+    receptor_store.add("1N45", receptor_file)
+    ligand_store.add("1XJZ", ligand_file)
+    receptor_store.save()
+    ligand_store.save()
+
+    assert set(StructureStore(store_dir).index) == {"1N45", "1XJZ"}
+
+
+def test_index_is_saved_during_the_run(tmp_path, monkeypatch):
+    import structure_store
+    monkeypatch.setattr(structure_store, "SAVE_EVERY", 2)
+    store_dir = str(tmp_path / "store")
+    store = StructureStore(store_dir)
+    for identifier in ("1N45", "1XJZ"):
+        path = str(tmp_path / "receptor_pdbs" / f"{identifier}.pdb")
+        write(path, f"ATOM {identifier}\n".encode())
+        store.add(identifier, path)
+
+    # No explicit save: a crash from here on keeps both entries
+    assert set(StructureStore(store_dir).index) == {"1N45", "1XJZ"}
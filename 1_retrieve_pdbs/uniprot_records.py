@@ -0,0 +1,69 @@
+import asyncio
+from urllib.parse import urlencode
+
+# ============================================================
+# Configuration Variables
+# ============================================================
+UNIPROT_STREAM_URL = "https://rest.uniprot.org/uniprotkb/stream"
+# Only the fields the ligand/receptor tables use: names, genes, Ensembl, Pfam and sequence length
+UNIPROT_FIELDS = "accession,protein_name,gene_names,xref_ensembl,xref_pfam,length"
+ACCESSION_BATCH_SIZE = 100  # Accessions per stream request (kept well below URL length limits)
+CONCURRENT_BATCHES = 4  # Batch requests in flight at once
+TIMEOUT = 60  # Seconds per batch request
+# ============================================================
+
+def sequence_length(record):
+    """Canonical sequence length of a UniProt JSON record, or None."""
+    sequence = (record or {}).get("sequence") or {}
+    if sequence.get("length") is not None:
+        return sequence["length"]
+    if sequence.get("value"):
+        return len(sequence["value"])
+    return None
+
+def batch_url(accessions):
+    """Stream URL returning the trimmed JSON records of all accessions in one response."""
+    query = " OR ".join(f"accession:{accession}" for accession in accessions)
+    return f"{UNIPROT_STREAM_URL}?{urlencode({'query': query, 'fields': UNIPROT_FIELDS, 'format': 'json'})}"
+
+async def fetch_uniprot_batch(session, accessions, timeout=TIMEOUT):
+    """Fetch the records of up to ACCESSION_BATCH_SIZE accessions in one request."""
+    try:
+        async with session.get(batch_url(accessions), timeout=timeout) as response:
+            if response.status != 200:
+                print(f"Failed to fetch UniProt records for {len(accessions)} accessions, Status code: {response.status}")
+                return {}
+            result = await response.json()
+    except Exception as e:
+        print(f"Error fetching UniProt records for {len(accessions)} accessions: {e}")
+        return {}
+
+    # Records are matched back by primary accession, or by a secondary accession
+    # when UniProt merged the requested entry into another one
+    requested = set(accessions)
+    records = {}
+    for record in result.get("results", []):
+        for accession in [record.get("primaryAccession")] + (record.get("secondaryAccessions") or []):
+            if accession in requested:
+                records.setdefault(accession, record)
+    return records
+
+async def fetch_uniprot_records(session, accessions, batch_size=ACCESSION_BATCH_SIZE, timeout=TIMEOUT,
+                                concurrency=CONCURRENT_BATCHES):
+    """
+    Return {accession: UniProt JSON record} for accessions, fetched through the
+    stream endpoint in batches of batch_size with at most `concurrency` batches in
+    flight. Accessions UniProt does not return are missing from the result.
+    """
+    unique_accessions = list(dict.fromkeys(accessions))
+    batches = [unique_accessions[i:i + batch_size] for i in range(0, len(unique_accessions), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(batch):
+        async with semaphore:
+            return await fetch_uniprot_batch(session, batch, timeout)
+
+    records = {}
+    for batch_records in await asyncio.gather(*(fetch(batch) for batch in batches)):
+        records.update(batch_records)
+    return records
@@ -1,9 +1,12 @@
 import glob
 import os
-import tarfile
-import requests
+import sys
+import asyncio
 import pandas as pd
-from bs4 import BeautifulSoup
+from async_downloader import download_all, download_and_extract_all
+from archive_extract import extract_archives, make_member_filter
+from response_store import import_response_csvs, load_responses
+from job_manifest import record_jobs, refresh_job_manifest, update_job_manifest
 
 # ============================================================
 # Configuration Variables
@@ -12,6 +15,11 @@ BASE_DIR = os.path.join(os.getcwd(), "data")  # Store everything inside 'data' f
 RESPONSES_DIR = os.path.join(BASE_DIR, "hdock_responses")  # Folder for response CSVs
 OUTPUT_DIR = os.path.join(BASE_DIR, "hdock_output")  # Folder for extracted outputs
 FINAL_CSV = os.path.join(BASE_DIR, "final_responses.csv")  # Final deduplicated CSV
+RESPONSE_STORE = os.path.join(BASE_DIR, "hdock_responses.sqlite")  # Job metadata + IDs imported from the response CSVs
+STORE_RAW_RESPONSES = True  # Keep each HTML page (zlib-compressed) in the store; False = metadata and ID only
+JOB_MANIFEST = os.path.join(BASE_DIR, "job_manifest.json")  # File counts, bytes and .out presence per job
+REFRESH_JOB_MANIFEST = False  # True = rebuild the manifest from OUTPUT_DIR (one scandir pass) before validating
+VERIFY_JOB_MANIFEST = False  # True (or run with --verify) = also stat every file of each job folder to catch in-place changes
 
 # Ensure directories exist
 os.makedirs(BASE_DIR, exist_ok=True)
@@ -21,45 +29,48 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # HDOCK Server Base URL
 BASE_URL = "http://hdock.phys.hust.edu.cn/data/"
 EXPECTED_FILES_COUNT = 113
-# ============================================================
+CONCURRENT_DOWNLOADS = 8  # Archives downloaded in parallel over one pooled session
+EXTRACT_WORKERS = None  # Processes extracting archives (None = all CPUs, 1 = serial)
+PARSE_WORKERS = None  # Processes parsing imported responses the fast title scan cannot handle (None = all CPUs, 1 = serial)
+
+# Pipelined mode: extract each archive while it downloads instead of saving the .tar.gz first
+PIPELINED_DOWNLOAD = False
+INCLUDE_PATTERNS = ["hdock_*.out"]  # Members to keep in pipelined mode (fnmatch on file name); None = keep all
+TOP_N_MODELS = None  # Also keep model_1.pdb ... model_N.pdb in pipelined mode; None = no model filter
 
-def extract_job_id(html):
-    """Extract job ID from HDOCK HTML response."""
-    try:
-        soup = BeautifulSoup(html, 'html.parser')
-        title_tag = soup.find('title')
-        if title_tag:
-            text = title_tag.get_text(strip=True)
-            if "HDOCK Server: Job results for" in text:
-                return text.split("for")[-1].strip().split()[0]
-        return "failed"
-    except Exception:
-        return "failed"
+# Keep the downloaded <download_ID>.tar.gz archives instead of extracting them; stage 3
+# then reads hdock_<download_ID>.out straight from the archive (set its archive_index_path)
+KEEP_ARCHIVES = False
+# ============================================================
 
 def process_csv_files():
-    """Process HDOCK response CSVs and add metadata."""
+    """
+    Import new or changed HDOCK response CSVs into the response store (job IDs are
+    extracted once, at import) and add the download metadata to every stored response.
+    """
     print("🔍 Processing CSV files...")
     csv_files = glob.glob(os.path.join(RESPONSES_DIR, "hdock_responses_*.csv"))
-    if not csv_files:
+    if not csv_files and not os.path.exists(RESPONSE_STORE):
         print(f"❌ No CSV files found in {RESPONSES_DIR}")
         return pd.DataFrame()
 
-    dfs = []
-    for file in csv_files:
-        print(f"📂 Processing {os.path.basename(file)}...")
-        df = pd.read_csv(file)
-        df["download_ID"] = df["Response"].apply(lambda x: extract_job_id(x) if isinstance(x, str) else "failed")
-        df["view_links"] = df["download_ID"].apply(lambda x: f"{BASE_URL}{x}/" if x != "failed" else "failed")
-        df["download_links"] = df["download_ID"].apply(lambda x: f"{BASE_URL}{x}/all_results.tar.gz" if x != "failed" else "failed")
-        dfs.append(df)
+    n_imported = import_response_csvs(RESPONSE_STORE, csv_files, keep_body=STORE_RAW_RESPONSES, workers=PARSE_WORKERS)
+    df = load_responses(RESPONSE_STORE)
 
-    print(f"✅ Processed {len(dfs)} CSV files")
-    return pd.concat(dfs, ignore_index=True)
+    worked = df["download_ID"] != "failed"
+    df["view_links"] = "failed"
+    df.loc[worked, "view_links"] = BASE_URL + df.loc[worked, "download_ID"] + "/"
+    df["download_links"] = "failed"
+    df.loc[worked, "download_links"] = BASE_URL + df.loc[worked, "download_ID"] + "/all_results.tar.gz"
+
+    print(f"✅ Processed {len(csv_files)} CSV files ({n_imported} imported, {len(df)} responses in {os.path.basename(RESPONSE_STORE)})")
+    return df
 
 def download_tar_gz_files(df):
-    """Download tar.gz files with validation checks."""
+    """Download tar.gz files concurrently (resumable, atomic rename) with validation checks."""
     print("\n⬇️ Starting downloads...")
     
+    jobs = {}
     for idx, row in df.iterrows():
         url = row["download_links"]
         job_id = row["download_ID"]
@@ -73,57 +84,93 @@ def download_tar_gz_files(df):
         if os.path.exists(folder_path):
             print(f"⏩ Skipping {job_id} - already exists")
             continue
-            
-        try:
-            if not os.path.exists(tar_path):
-                print(f"🔽 Downloading {job_id}...")
-                response = requests.get(url, stream=True)
-                if response.status_code == 200:
-                    with open(tar_path, "wb") as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    print(f"✅ Successfully downloaded {job_id}")
-                else:
-                    df.at[idx, "download_links"] = "failed"
-                    print(f"❌ Failed to download {job_id} (HTTP {response.status_code})")
-        except Exception as e:
-            print(f"❌ Download failed for {job_id}: {str(e)}")
-            df.at[idx, "download_links"] = "failed"
+        
+        if not os.path.exists(tar_path):
+            jobs.setdefault(job_id, url)
+    
+    if not jobs:
+        return
+    
+    if PIPELINED_DOWNLOAD:
+        # Stream each archive into tarfile; only the selected members are written to disk
+        member_filter = make_member_filter(INCLUDE_PATTERNS, TOP_N_MODELS)
+        results = asyncio.run(download_and_extract_all(
+            list(jobs.items()), OUTPUT_DIR, concurrency=CONCURRENT_DOWNLOADS, member_filter=member_filter
+        ))
+    else:
+        results = asyncio.run(download_all(list(jobs.items()), OUTPUT_DIR, concurrency=CONCURRENT_DOWNLOADS))
+    failed_ids = [job_id for job_id, (success, _) in results.items() if not success]
+    if PIPELINED_DOWNLOAD or KEEP_ARCHIVES:
+        # These jobs are final now (extracted or kept as archives): record them in the manifest
+        record_jobs(JOB_MANIFEST, OUTPUT_DIR, [job_id for job_id, (success, _) in results.items() if success])
+    df.loc[df["download_ID"].isin(failed_ids), "download_links"] = "failed"
 
 def extract_tar_gz_files():
-    """Extract downloaded tar.gz files."""
+    """
+    Extract downloaded tar.gz files in parallel. Each archive is extracted into a
+    private temporary folder that is moved into OUTPUT_DIR only on success.
+    """
+    if KEEP_ARCHIVES:
+        print("\n📦 Keeping archives, extraction skipped")
+        return
     print("\n📦 Extracting files...")
-    for tar_file in glob.glob(os.path.join(OUTPUT_DIR, "*.tar.gz")):
-        try:
-            print(f"📂 Extracting {os.path.basename(tar_file)}...")
-            with tarfile.open(tar_file, "r:gz") as tar:
-                tar.extractall(path=OUTPUT_DIR)
-            os.remove(tar_file)
-            print(f"✅ Successfully extracted {os.path.basename(tar_file)}")
-        except Exception as e:
-            print(f"❌ Extraction failed for {os.path.basename(tar_file)}: {str(e)}")
+    tar_files = glob.glob(os.path.join(OUTPUT_DIR, "*.tar.gz"))
+    print(f"📂 Extracting {len(tar_files)} archives...")
+    extracted_ids = []
+    for tar_file, success, message in extract_archives(tar_files, OUTPUT_DIR, workers=EXTRACT_WORKERS):
+        if success:
+            print(f"✅ Successfully extracted {os.path.basename(tar_file)} ({message})")
+            extracted_ids.append(os.path.basename(tar_file)[:-len(".tar.gz")])
+        else:
+            print(f"❌ Extraction failed for {os.path.basename(tar_file)}: {message}")
+    if extracted_ids:
+        record_jobs(JOB_MANIFEST, OUTPUT_DIR, extracted_ids)
 
 def check_expected_count(df):
-    """Check if the output folder contains the expected number of files."""
+    """
+    Check if each job's output holds the expected number of files, using only the
+    job manifest (one stat per recorded job, or the whole manifest rebuilt if
+    REFRESH_JOB_MANIFEST is set; VERIFY_JOB_MANIFEST also checks every file).
+    When archive members were filtered (pipelined mode), the job instead only
+    needs its hdock_<download_ID>.out file. Archives kept with KEEP_ARCHIVES are
+    counted from their member list (already extracted folders count as well).
+    """
     print("\n🔢 Validating file counts...")
-    df["expected_count"] = df["download_ID"].apply(
-        lambda x: "worked" if (
-            x != "failed" and 
-            os.path.exists(os.path.join(OUTPUT_DIR, x)) and 
-            len(os.listdir(os.path.join(OUTPUT_DIR, x))) >= EXPECTED_FILES_COUNT
-        ) else "failed"
-    )
+    download_IDs = [x for x in df["download_ID"].unique() if x != "failed"]
+    if REFRESH_JOB_MANIFEST:
+        print(f"🔄 Refreshing job manifest from {OUTPUT_DIR}...")
+        manifest = refresh_job_manifest(JOB_MANIFEST, OUTPUT_DIR, verify=VERIFY_JOB_MANIFEST)
+    else:
+        # Only these jobs are checked, and recorded ones are trusted unless their folder changed
+        manifest = update_job_manifest(JOB_MANIFEST, OUTPUT_DIR, download_IDs, verify=VERIFY_JOB_MANIFEST)
+    jobs = manifest["jobs"]
+
+    filtered = PIPELINED_DOWNLOAD and make_member_filter(INCLUDE_PATTERNS, TOP_N_MODELS) is not None
+    # Jobs extracted before KEEP_ARCHIVES was set stay valid as folders
+    kinds = ("archive", "folder") if KEEP_ARCHIVES and not PIPELINED_DOWNLOAD else ("folder",)
+
+    def job_status(download_ID):
+        entry = jobs.get(download_ID)
+        if entry is None or entry["kind"] not in kinds:
+            return "failed"
+        if filtered:
+            return "worked" if entry["has_out"] else "failed"
+        return "worked" if entry["n_files"] >= EXPECTED_FILES_COUNT else "failed"
+
+    # Rows often repeat a job: resolve each download_ID once
+    status = {download_ID: job_status(download_ID) for download_ID in download_IDs}
+    df["expected_count"] = df["download_ID"].map(status).fillna("failed")
 
 def validate_final_status(df):
     """Calculate final validation status."""
     print("\n✅ Final validation...")
     status_columns = ["download_ID", "view_links", "download_links", "expected_count"]
-    df["valid_download"] = df.apply(
-        lambda row: "worked" if all(row[col] != "failed" for col in status_columns) else "failed",
-        axis=1
-    )
+    worked = (df[status_columns] != "failed").all(axis=1)
+    df["valid_download"] = worked.map({True: "worked", False: "failed"})
 
 if __name__ == "__main__":
+    if "--verify" in sys.argv[1:]:
+        VERIFY_JOB_MANIFEST = True
     combined_df = process_csv_files()
     
     download_tar_gz_files(combined_df)
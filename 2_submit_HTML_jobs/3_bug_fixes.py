@@ -1,10 +1,19 @@
 import os
+import sys
+import glob
 import pandas as pd
 import shutil
+from response_store import import_response_csvs, load_responses
+
+# The structure store lives with the stage that fills it; link files the same way it does
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "1_retrieve_pdbs"))
+from structure_store import link_file
 
 # -------------- Configuration --------------
-# Path to your final responses CSV file (using project folder structure)
-csv_file = os.path.join(os.getcwd(), "data", "hdock_responses", "final_responses.csv")
+# Response store written by 2_hdock_downloader.py / response_store.py (job metadata + download_ID per response)
+response_store = os.path.join(os.getcwd(), "data", "hdock_responses.sqlite")
+# Response CSVs still to be imported into the store (unchanged files are skipped)
+responses_dir = os.path.join(os.getcwd(), "data", "hdock_responses")
 
 # Source directories (these should never change after being created)
 source_receptor_dir = os.path.join(os.getcwd(), "data", "receptor_pdbs")
@@ -16,8 +25,16 @@ submit_ligand_dir = os.path.join(os.getcwd(), "data", "submit_jobs_ligands")
 
 # -------------------------------------------
 
-# Load final CSV file
-df = pd.read_csv(csv_file)
+def link_into(source_file, target_dir):
+    """
+    Hardlink source_file into target_dir instead of copying it (the source folders
+    already link to the shared structure store), through structure_store.link_file.
+    """
+    link_file(source_file, os.path.join(target_dir, os.path.basename(source_file)))
+
+# Load job metadata and download IDs from the response store
+import_response_csvs(response_store, glob.glob(os.path.join(responses_dir, "hdock_responses_*.csv")))
+df = load_responses(response_store)
 
 # Determine failed jobs by grouping on 'job_name'
 failed_jobs = (
@@ -53,23 +70,23 @@ for folder in [submit_receptor_dir, submit_ligand_dir]:
         shutil.rmtree(folder)
     os.makedirs(folder, exist_ok=True)
 
-# Copy the failed receptor files from the source directory to the submission directory.
-print("\nCopying receptor files for re-submission...")
+# Link the failed receptor files from the source directory into the submission directory.
+print("\nLinking receptor files for re-submission...")
 for fname in receptor_files:
     source_file = os.path.join(source_receptor_dir, fname)
     if os.path.exists(source_file):
-        shutil.copy(source_file, submit_receptor_dir)
-        print(f"Copied: {fname}")
+        link_into(source_file, submit_receptor_dir)
+        print(f"Linked: {fname}")
     else:
         print(f"Source receptor file not found: {fname}")
 
-# Copy the failed ligand files from the source directory to the submission directory.
-print("\nCopying ligand files for re-submission...")
+# Link the failed ligand files from the source directory into the submission directory.
+print("\nLinking ligand files for re-submission...")
 for fname in ligand_files:
     source_file = os.path.join(source_ligand_dir, fname)
     if os.path.exists(source_file):
-        shutil.copy(source_file, submit_ligand_dir)
-        print(f"Copied: {fname}")
+        link_into(source_file, submit_ligand_dir)
+        print(f"Linked: {fname}")
     else:
         print(f"Source ligand file not found: {fname}")
 
@@ -0,0 +1,114 @@
+import os
+import re
+import shutil
+import fnmatch
+import tarfile
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+# Use tarfile's "data" extraction filter where this Python provides it
+_EXTRACT_KWARGS = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
+def make_member_filter(include=None, top_models=None):
+    """
+    Build a predicate on archive member names (basename matched against the fnmatch
+    patterns in include, e.g. ["hdock_*.out"]; top_models additionally keeps
+    model_<k>.pdb for k <= top_models). Returns None (keep everything) if neither is set.
+    """
+    if not include and top_models is None:
+        return None
+    patterns = list(include or [])
+
+    def keep(name):
+        basename = os.path.basename(name)
+        if any(fnmatch.fnmatch(basename, pattern) for pattern in patterns):
+            return True
+        if top_models is not None:
+            match = re.fullmatch(r"model_(\d+)\.pdb", basename)
+            return bool(match) and int(match.group(1)) <= top_models
+        return False
+
+    return keep
+
+def promote_extracted(tmp_dir, output_dir):
+    """Move every top-level entry of a finished extraction into output_dir (atomic per entry)."""
+    for name in os.listdir(tmp_dir):
+        target = os.path.join(output_dir, name)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.replace(os.path.join(tmp_dir, name), target)
+
+def _safe_member(member):
+    """Only regular files and folders with relative paths that stay inside the target."""
+    name = member.name
+    return (member.isfile() or member.isdir()) and not os.path.isabs(name) and ".." not in name.split("/")
+
+def extract_stream(fileobj, dest_dir, member_filter=None):
+    """
+    Extract a gzip'd tar read sequentially from fileobj (tarfile 'r|gz' stream mode)
+    into dest_dir, writing only files accepted by member_filter.
+    Returns (files_written, bytes_written).
+    """
+    files_written = 0
+    bytes_written = 0
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
+        for member in tar:
+            if not _safe_member(member):
+                continue
+            if member.isfile() and member_filter is not None and not member_filter(member.name):
+                continue
+            if member.isdir():
+                os.makedirs(os.path.join(dest_dir, member.name), exist_ok=True)
+                continue
+            tar.extract(member, path=dest_dir, **_EXTRACT_KWARGS)
+            files_written += 1
+            bytes_written += member.size
+    return files_written, bytes_written
+
+def clean_stale_extractions(output_dir):
+    """Remove private extraction folders left behind by an interrupted run."""
+    for name in os.listdir(output_dir):
+        if name.startswith(".extracting_"):
+            shutil.rmtree(os.path.join(output_dir, name), ignore_errors=True)
+
+def extract_archive(tar_file, output_dir, member_filter=None, remove_archive=True):
+    """
+    Extract one .tar.gz into a private temporary folder inside output_dir and move
+    its contents into output_dir only if the whole archive was extracted, so a crash
+    never leaves a half-populated job folder behind.
+    Returns (tar_file, success, message).
+    """
+    tmp_dir = tempfile.mkdtemp(prefix=".extracting_", dir=output_dir)
+    try:
+        with open(tar_file, "rb") as f:
+            files_written, bytes_written = extract_stream(f, tmp_dir, member_filter)
+        promote_extracted(tmp_dir, output_dir)
+        if remove_archive:
+            os.remove(tar_file)
+        return tar_file, True, f"{files_written} files, {bytes_written / 1e6:.1f} MB"
+    except Exception as e:
+        # Any failure (a corrupt stream, an exception raised by member_filter...)
+        # is recorded for this archive only, so the other archives still get extracted
+        return tar_file, False, f"{type(e).__name__}: {e}"
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _extract_archive_task(task):
+    """Process-pool entry point for extract_archive."""
+    return extract_archive(*task)
+
+def extract_archives(tar_files, output_dir, workers=None):
+    """
+    Extract tar_files in parallel (workers: None = os.cpu_count(), 1 = serial),
+    one archive per worker at a time, each isolated as in extract_archive.
+    Yields (tar_file, success, message) as archives finish.
+    """
+    clean_stale_extractions(output_dir)
+    tasks = [(tar_file, output_dir) for tar_file in tar_files]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        for task in tasks:
+            yield extract_archive(*task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_extract_archive_task, tasks)
@@ -0,0 +1,216 @@
+import os
+import time
+import shutil
+import asyncio
+import tarfile
+import tempfile
+import aiohttp
+from archive_extract import extract_stream, promote_extracted
+
+# ============================================================
+# Configuration Variables
+# ============================================================
+CONCURRENT_DOWNLOADS = 8     # Archives downloaded at the same time (also the connection pool size)
+CHUNK_SIZE = 1024 * 1024     # Bytes read from the socket per write
+CONNECT_TIMEOUT = 30         # Seconds to establish a connection
+READ_TIMEOUT = 120           # Seconds without receiving any data before giving up
+MAX_ATTEMPTS = 3             # Attempts per file; each retry resumes from the partial file
+STREAM_BUFFER = 256 * 1024   # Bytes handed to tarfile per read in pipelined mode
+# ============================================================
+
+def _expected_size(response, resume_from):
+    """Total file size announced by the server, or None if it did not say."""
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[-1]
+        if total.isdigit():
+            return int(total)
+    if response.content_length is not None:
+        return response.content_length + (resume_from if response.status == 206 else 0)
+    return None
+
+def _unsatisfiable_total(response):
+    """Full size N from a 416 response's 'Content-Range: bytes */N', or None."""
+    content_range = response.headers.get("Content-Range", "")
+    total = content_range.rsplit("/", 1)[-1] if content_range.startswith("bytes */") else ""
+    return int(total) if total.isdigit() else None
+
+async def download_file(session, url, dest_path, chunk_size=CHUNK_SIZE, max_attempts=MAX_ATTEMPTS):
+    """
+    Download url to dest_path through a temporary '<dest_path>.part' file.
+    An existing .part file is resumed with an HTTP Range request; the file is
+    renamed to dest_path only once the announced size has been received, so an
+    interrupted download never leaves a truncated file under the final name.
+    Returns (success, message, bytes_received, seconds).
+    """
+    part_path = f"{dest_path}.part"
+    received = 0
+    start = time.perf_counter()
+    last_error = "unknown error"
+
+    for attempt in range(1, max_attempts + 1):
+        if attempt > 1:
+            print(f"🔁 Retrying {os.path.basename(dest_path)} ({attempt}/{max_attempts}): {last_error}")
+            await asyncio.sleep(2 ** (attempt - 2))
+
+        resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={resume_from}-"} if resume_from else {}
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 416 and resume_from:
+                    # Nothing left to fetch only if the partial file holds exactly the whole body;
+                    # a stale or oversized .part is discarded and fetched again from byte 0
+                    if _unsatisfiable_total(response) == os.path.getsize(part_path):
+                        os.replace(part_path, dest_path)
+                        return True, "complete", received, time.perf_counter() - start
+                    os.remove(part_path)
+                    last_error = f"stale partial file ({resume_from} bytes)"
+                    continue
+                if response.status >= 500:
+                    last_error = f"HTTP {response.status}"
+                    continue
+                if response.status not in (200, 206):
+                    return False, f"HTTP {response.status}", received, time.perf_counter() - start
+
+                # A 200 means the server ignored the Range header: start over
+                mode = "ab" if response.status == 206 else "wb"
+                expected = _expected_size(response, resume_from)
+                with open(part_path, mode) as f:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+                        received += len(chunk)
+
+            size = os.path.getsize(part_path)
+            if expected is not None and size != expected:
+                last_error = f"incomplete ({size} of {expected} bytes)"
+                continue
+            os.replace(part_path, dest_path)
+            return True, "complete", received, time.perf_counter() - start
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+    return False, last_error, received, time.perf_counter() - start
+
+async def _download_job(session, semaphore, job_id, url, dest_path):
+    """Download one job archive under the shared semaphore and report its throughput."""
+    async with semaphore:
+        print(f"🔽 Downloading {job_id}...")
+        success, message, received, seconds = await download_file(session, url, dest_path)
+    mb = received / 1e6
+    rate = mb / seconds if seconds > 0 else 0.0
+    if success:
+        print(f"✅ Successfully downloaded {job_id} ({mb:.1f} MB in {seconds:.1f} s, {rate:.1f} MB/s)")
+    else:
+        resume_note = ", partial file kept for resume" if os.path.exists(f"{dest_path}.part") else ""
+        print(f"❌ Download failed for {job_id}: {message} ({mb:.1f} MB received{resume_note})")
+    return job_id, success, message
+
+async def download_all(jobs, output_dir, concurrency=CONCURRENT_DOWNLOADS):
+    """
+    Download every (job_id, url) in jobs to '<output_dir>/<job_id>.tar.gz' using one
+    pooled session with at most `concurrency` transfers in flight.
+    Returns {job_id: (success, message)}.
+    """
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    # auto_decompress=False: the archive bytes are stored as sent, so Range offsets stay valid
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector, auto_decompress=False) as session:
+        tasks = [
+            _download_job(session, semaphore, job_id, url, os.path.join(output_dir, f"{job_id}.tar.gz"))
+            for job_id, url in jobs
+        ]
+        results = await asyncio.gather(*tasks)
+    return {job_id: (success, message) for job_id, success, message in results}
+
+# -----------------------------
+# Pipelined download + extraction
+# -----------------------------
+
+class _BlockingBody:
+    """Blocking read() view of an aiohttp response body, used by tarfile from a worker thread."""
+
+    def __init__(self, response, loop):
+        self._response = response
+        self._loop = loop
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = STREAM_BUFFER
+        future = asyncio.run_coroutine_threadsafe(self._response.content.read(size), self._loop)
+        data = future.result()
+        self.bytes_read += len(data)
+        return data
+
+async def download_and_extract(session, url, output_dir, member_filter=None, max_attempts=MAX_ATTEMPTS):
+    """
+    Stream url straight into tarfile and extract it without writing the archive to disk.
+    Members go to a private temporary folder inside output_dir that is moved into
+    place only after the whole archive was read; a failed attempt is discarded and
+    retried from the start (a gzip stream cannot be resumed).
+    Returns (success, message, bytes_received, files_written, seconds).
+    """
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    last_error = "unknown error"
+    received = 0
+
+    for attempt in range(1, max_attempts + 1):
+        if attempt > 1:
+            print(f"🔁 Retrying {url} ({attempt}/{max_attempts}): {last_error}")
+            await asyncio.sleep(2 ** (attempt - 2))
+
+        tmp_dir = tempfile.mkdtemp(prefix=".extracting_", dir=output_dir)
+        try:
+            async with session.get(url) as response:
+                if response.status >= 500:
+                    last_error = f"HTTP {response.status}"
+                    continue
+                if response.status != 200:
+                    return False, f"HTTP {response.status}", received, 0, time.perf_counter() - start
+                body = _BlockingBody(response, loop)
+                try:
+                    files_written, _ = await loop.run_in_executor(None, extract_stream, body, tmp_dir, member_filter)
+                finally:
+                    received += body.bytes_read
+            promote_extracted(tmp_dir, output_dir)
+            return True, "complete", received, files_written, time.perf_counter() - start
+        except (aiohttp.ClientError, asyncio.TimeoutError, tarfile.TarError, EOFError, OSError) as e:
+            last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return False, last_error, received, 0, time.perf_counter() - start
+
+async def _download_and_extract_job(session, semaphore, job_id, url, output_dir, member_filter):
+    """Stream-extract one job archive under the shared semaphore and report its throughput."""
+    async with semaphore:
+        print(f"🔽 Downloading and extracting {job_id}...")
+        success, message, received, files_written, seconds = await download_and_extract(
+            session, url, output_dir, member_filter
+        )
+    mb = received / 1e6
+    rate = mb / seconds if seconds > 0 else 0.0
+    if success:
+        print(f"✅ Successfully extracted {job_id} ({files_written} files, {mb:.1f} MB in {seconds:.1f} s, {rate:.1f} MB/s)")
+    else:
+        print(f"❌ Download/extraction failed for {job_id}: {message}")
+    return job_id, success, message
+
+async def download_and_extract_all(jobs, output_dir, concurrency=CONCURRENT_DOWNLOADS, member_filter=None):
+    """
+    Pipelined variant of download_all: every (job_id, url) archive is extracted into
+    output_dir while it downloads, keeping only members accepted by member_filter.
+    Returns {job_id: (success, message)}.
+    """
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector, auto_decompress=False) as session:
+        tasks = [
+            _download_and_extract_job(session, semaphore, job_id, url, output_dir, member_filter)
+            for job_id, url in jobs
+        ]
+        results = await asyncio.gather(*tasks)
+    return {job_id: (success, message) for job_id, success, message in results}
@@ -0,0 +1,80 @@
+import os
+import glob
+import time
+import random
+import pandas as pd
+from bs4 import BeautifulSoup
+from job_id_parser import extract_job_id, extract_job_ids
+
+# ============================================================
+# Configuration Variables
+# ============================================================
+RESPONSES_DIR = os.path.join(os.getcwd(), "data", "hdock_responses")  # Saved response CSVs, used if present
+N_SYNTHETIC = 500    # Pages generated when there are no saved responses
+FAILED_SHARE = 0.1   # Share of synthetic pages that are error pages
+SEED = 0
+# ============================================================
+
+def extract_job_id_bs4(html):
+    """The job-ID extraction used by 2_hdock_downloader.py before job_id_parser existed."""
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
+        title_tag = soup.find('title')
+        if title_tag:
+            text = title_tag.get_text(strip=True)
+            if "HDOCK Server: Job results for" in text:
+                return text.split("for")[-1].strip().split()[0]
+        return "failed"
+    except Exception:
+        return "failed"
+
+def synthetic_response(rng, failed):
+    """An HDOCK-like submission response: a results page, or an error page without the job title."""
+    job_id = "%016x" % rng.getrandbits(64)
+    title = "HDOCK Server: Error" if failed else f"HDOCK Server: Job results for {job_id}"
+    rows = "\n".join(
+        f"<tr><td>{i}</td><td>model_{i}.pdb</td><td>{rng.uniform(-350, -100):.2f}</td></tr>" for i in range(300)
+    )
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{title}</title>\n<link rel=\"stylesheet\" href=\"/style.css\">\n</head>\n"
+        f"<body>\n<h1>{title}</h1>\n<table>\n{rows}\n</table>\n"
+        "<script>function refresh() { location.reload(); }</script>\n</body>\n</html>\n"
+    )
+
+def load_responses():
+    """Responses from the saved hdock_responses_*.csv files, or a synthetic corpus."""
+    csv_files = glob.glob(os.path.join(RESPONSES_DIR, "hdock_responses_*.csv"))
+    if csv_files:
+        df = pd.concat([pd.read_csv(file) for file in csv_files], ignore_index=True)
+        return df["Response"].tolist(), f"{len(csv_files)} saved CSV files"
+    rng = random.Random(SEED)
+    responses = [synthetic_response(rng, rng.random() < FAILED_SHARE) for _ in range(N_SYNTHETIC)]
+    return responses, "synthetic pages"
+
+if __name__ == "__main__":
+    responses, source = load_responses()
+    mb = sum(len(r) for r in responses if isinstance(r, str)) / 1e6
+
+    start = time.perf_counter()
+    expected = [extract_job_id_bs4(r) if isinstance(r, str) else "failed" for r in responses]
+    t_bs4 = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [extract_job_id(r) for r in responses]
+    t_single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = extract_job_ids(responses)
+    t_batched = time.perf_counter() - start
+
+    # The fast paths must resolve exactly the same IDs before timing means anything
+    for name, result in (("extract_job_id", single), ("extract_job_ids", batched)):
+        mismatches = sum(a != b for a, b in zip(expected, result))
+        if mismatches:
+            raise SystemExit(f"{name} differs from the BeautifulSoup parse on {mismatches} responses")
+
+    print(f"Responses: {len(responses)} ({mb:.1f} MB, {source})")
+    print(f"BeautifulSoup per row: {t_bs4:.3f} s")
+    print(f"extract_job_id:        {t_single:.3f} s ({t_bs4 / t_single:.0f}x)")
+    print(f"extract_job_ids:       {t_batched:.3f} s ({t_bs4 / t_batched:.0f}x)")
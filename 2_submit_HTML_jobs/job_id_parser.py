@@ -0,0 +1,87 @@
+import os
+import re
+from html import unescape
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup
+
+# ============================================================
+# Job-ID parsing
+# ============================================================
+TITLE_PREFIX = "HDOCK Server: Job results for"
+HEAD_SCAN_CHARS = 64 * 1024  # Only this much of a page is searched for its <title> on the fast path
+# ============================================================
+
+_TITLE_RE = re.compile(r"<title\b[^>]*>(.*?)</title\s*>", re.IGNORECASE | re.DOTALL)
+# Markup before the title that html.parser would read differently from a plain regex
+_RAW_TEXT_RE = re.compile(r"<!--|<script\b|<style\b|<textarea\b", re.IGNORECASE)
+
+def _job_id_from_title(text):
+    """Job ID from the text of an HDOCK results page title, or "failed"."""
+    if TITLE_PREFIX in text:
+        words = text.split("for")[-1].split()
+        if words:
+            return words[0]
+    return "failed"
+
+def _title_fast(html):
+    """
+    Text of the page's <title>, found by scanning only the start of the document.
+    Returns None when the fast path cannot be sure it matches html.parser
+    (no title near the top, comments/scripts before it, or markup inside it).
+    """
+    head = html[:HEAD_SCAN_CHARS]
+    match = _TITLE_RE.search(head)
+    if match is None or "<" in match.group(1) or _RAW_TEXT_RE.search(head, 0, match.start()):
+        return None
+    return unescape(match.group(1)).strip()
+
+def _extract_job_id_full(html):
+    """Extract job ID by building the full BeautifulSoup tree (fallback path)."""
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
+        title_tag = soup.find('title')
+        if title_tag:
+            return _job_id_from_title(title_tag.get_text(strip=True))
+        return "failed"
+    except Exception:
+        return "failed"
+
+def extract_job_id(html):
+    """Extract job ID from HDOCK HTML response."""
+    if not isinstance(html, str):
+        return "failed"
+    title = _title_fast(html)
+    if title is not None:
+        return _job_id_from_title(title)
+    return _extract_job_id_full(html)
+
+def extract_job_ids(responses, workers=None, pool=None):
+    """
+    Extract the job ID of every response (non-strings give "failed").
+    Each distinct page is parsed once; pages the fast path cannot handle are
+    parsed with BeautifulSoup across a process pool (workers: None = os.cpu_count(),
+    1 = serial). A caller parsing many batches passes its own executor as pool,
+    which is then used instead of starting one per call.
+    Returns a list aligned with responses.
+    """
+    responses = list(responses)
+    job_ids = {}
+    slow_pages = []
+    for html in set(r for r in responses if isinstance(r, str)):
+        title = _title_fast(html)
+        if title is None:
+            slow_pages.append(html)
+        else:
+            job_ids[html] = _job_id_from_title(title)
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(slow_pages) // (workers * 4))
+    if len(slow_pages) < 2 or (pool is None and workers == 1):
+        job_ids.update(zip(slow_pages, map(_extract_job_id_full, slow_pages)))
+    elif pool is not None:
+        job_ids.update(zip(slow_pages, pool.map(_extract_job_id_full, slow_pages, chunksize=chunksize)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            job_ids.update(zip(slow_pages, pool.map(_extract_job_id_full, slow_pages, chunksize=chunksize)))
+
+    return [job_ids[r] if isinstance(r, str) else "failed" for r in responses]
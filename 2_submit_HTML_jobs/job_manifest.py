@@ -0,0 +1,209 @@
+import os
+import json
+import stat as stat_module
+import tarfile
+
+# ============================================================
+# Job manifest layout
+# ============================================================
+# {"jobs": {download_ID: {"kind": "folder" | "archive", "n_files", "total_bytes",
+#                         "has_out", "mtime_ns", "size", "members"}}}
+# n_files counts the entries of OUTPUT_DIR/<download_ID>/ (what len(os.listdir) gave),
+# or the regular files of <download_ID>.tar.gz for archives kept unextracted.
+# has_out tells whether hdock_<download_ID>.out is present.
+# members (folders only) maps each file name to [size, mtime_ns]; only verify mode
+# checks them, to catch a file rewritten in place (which leaves the folder's mtime alone).
+ARCHIVE_SUFFIX = ".tar.gz"
+# ============================================================
+
+def scan_job_folder(folder_path, download_ID):
+    """Summarize one extracted job folder with a single os.scandir call."""
+    n_files = 0
+    total_bytes = 0
+    has_out = False
+    out_name = f"hdock_{download_ID}.out"
+    members = {}
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            n_files += 1
+            if entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                total_bytes += stat.st_size
+                members[entry.name] = [stat.st_size, stat.st_mtime_ns]
+                has_out = has_out or entry.name == out_name
+    return {"kind": "folder", "n_files": n_files, "total_bytes": total_bytes, "has_out": has_out, "members": members}
+
+def scan_job_archive(tar_file, download_ID):
+    """Summarize one kept .tar.gz from its member headers (read as a stream, not extracted)."""
+    n_files = 0
+    total_bytes = 0
+    has_out = False
+    out_name = f"hdock_{download_ID}.out"
+    with tarfile.open(tar_file, "r|gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            n_files += 1
+            total_bytes += member.size
+            has_out = has_out or os.path.basename(member.name) == out_name
+    return {"kind": "archive", "n_files": n_files, "total_bytes": total_bytes, "has_out": has_out}
+
+def load_job_manifest(manifest_path):
+    """Load the job manifest, or return None if there is none (or it is unreadable)."""
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable job manifest {manifest_path}: {e}")
+        return None
+
+def save_job_manifest(manifest_path, manifest):
+    """Write the job manifest atomically (temp file + rename)."""
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+def _job_entry(path, download_ID, kind, stat):
+    """Scan one job folder or archive and tag the summary with its mtime (and size)."""
+    if kind == "folder":
+        entry = scan_job_folder(path, download_ID)
+    else:
+        entry = scan_job_archive(path, download_ID)
+    entry["mtime_ns"] = stat.st_mtime_ns
+    entry["size"] = stat.st_size
+    return entry
+
+def _entry_current(entry, path, kind, stat, verify=False):
+    """
+    True if a manifest entry still describes the job at path: same kind, mtime and
+    size. With verify, every recorded member of a folder is also stat-ed and must
+    have the recorded size and mtime (one stat per file, so only on request).
+    """
+    if not entry or entry.get("kind") != kind or entry.get("mtime_ns") != stat.st_mtime_ns \
+            or entry.get("size") != stat.st_size:
+        return False
+    if not verify or kind == "archive":
+        return True
+    if "members" not in entry:
+        return False  # Entry from before member sizes were recorded
+    for name, (size, mtime_ns) in entry["members"].items():
+        try:
+            member_stat = os.stat(os.path.join(path, name), follow_symlinks=False)
+        except OSError:
+            return False
+        if member_stat.st_size != size or member_stat.st_mtime_ns != mtime_ns:
+            return False
+    return True
+
+def _job_paths(output_dir, download_ID):
+    """(kind, path) of a job's extracted folder and of its archive, in precedence order."""
+    return (("folder", os.path.join(output_dir, download_ID)),
+            ("archive", os.path.join(output_dir, f"{download_ID}{ARCHIVE_SUFFIX}")))
+
+def update_job_manifest(manifest_path, output_dir, download_IDs, verify=False):
+    """
+    Bring the manifest entries of download_IDs up to date without looking at any
+    other job. The entries record_jobs and refresh_job_manifest wrote are trusted:
+    a recorded job costs one stat of its folder (or archive), and is only rescanned
+    if that stat no longer matches (verify also checks the folder's member files).
+    A job missing from the manifest is looked up (at most two stats) and recorded if
+    it exists; a recorded job whose folder and archive are both gone is dropped.
+    The manifest is only rewritten if something changed.
+    """
+    manifest = load_job_manifest(manifest_path) or {"jobs": {}}
+    jobs = manifest["jobs"]
+    changed = False
+    for download_ID in download_IDs:
+        cached = jobs.get(download_ID)
+        if cached is not None:
+            path = dict(_job_paths(output_dir, download_ID))[cached["kind"]]
+            try:
+                if _entry_current(cached, path, cached["kind"], os.stat(path), verify):
+                    continue
+            except OSError:
+                pass
+        for kind, path in _job_paths(output_dir, download_ID):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if (kind == "folder") != stat_module.S_ISDIR(stat.st_mode):
+                continue
+            try:
+                jobs[download_ID] = _job_entry(path, download_ID, kind, stat)
+            except (tarfile.TarError, EOFError, OSError) as e:
+                print(f"⚠️ Cannot scan {os.path.basename(path)}: {e}")
+                jobs.pop(download_ID, None)
+            changed = True
+            break
+        else:
+            if jobs.pop(download_ID, None) is not None:
+                changed = True
+    if changed:
+        save_job_manifest(manifest_path, manifest)
+    return manifest
+
+def record_jobs(manifest_path, output_dir, download_IDs):
+    """
+    Add or update the manifest entries of just-extracted (or just-downloaded, when
+    archives are kept) jobs, without rescanning the rest of output_dir.
+    """
+    manifest = load_job_manifest(manifest_path) or {"jobs": {}}
+    for download_ID in download_IDs:
+        folder_path = os.path.join(output_dir, download_ID)
+        tar_file = os.path.join(output_dir, f"{download_ID}{ARCHIVE_SUFFIX}")
+        try:
+            if os.path.isdir(folder_path):
+                manifest["jobs"][download_ID] = _job_entry(folder_path, download_ID, "folder", os.stat(folder_path))
+            elif os.path.isfile(tar_file):
+                manifest["jobs"][download_ID] = _job_entry(tar_file, download_ID, "archive", os.stat(tar_file))
+        except (tarfile.TarError, EOFError, OSError) as e:
+            print(f"⚠️ Cannot record {download_ID} in the job manifest: {e}")
+    save_job_manifest(manifest_path, manifest)
+    return manifest
+
+def refresh_job_manifest(manifest_path, output_dir, verify=False):
+    """
+    Rebuild the manifest from one os.scandir pass over output_dir. Job folders and
+    archives whose entry is still current (see _entry_current) are not rescanned;
+    a folder's mtime changes whenever an entry is added to or removed from it, and
+    verify also catches member files rewritten in place.
+    Extracted folders take precedence over archives of the same job.
+    """
+    previous = (load_job_manifest(manifest_path) or {"jobs": {}})["jobs"]
+    jobs = {}
+    archives = []
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                kind, download_ID = "folder", entry.name
+            elif entry.is_file() and entry.name.endswith(ARCHIVE_SUFFIX):
+                kind, download_ID = "archive", entry.name[:-len(ARCHIVE_SUFFIX)]
+            else:
+                continue
+            stat = entry.stat()
+            cached = previous.get(download_ID)
+            if _entry_current(cached, entry.path, kind, stat, verify):
+                summary = cached
+            else:
+                try:
+                    summary = _job_entry(entry.path, download_ID, kind, stat)
+                except (tarfile.TarError, EOFError, OSError) as e:
+                    print(f"⚠️ Cannot scan {entry.name}: {e}")
+                    continue
+            if kind == "folder":
+                jobs[download_ID] = summary
+            else:
+                archives.append((download_ID, summary))
+
+    for download_ID, summary in archives:
+        jobs.setdefault(download_ID, summary)
+
+    manifest = {"jobs": jobs}
+    save_job_manifest(manifest_path, manifest)
+    return manifest
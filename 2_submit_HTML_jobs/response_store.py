@@ -0,0 +1,149 @@
+import os
+import glob
+import zlib
+import sqlite3
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from job_id_parser import extract_job_ids
+
+# ============================================================
+# Configuration Variables (importer)
+# ============================================================
+BASE_DIR = os.path.join(os.getcwd(), "data")
+RESPONSES_DIR = os.path.join(BASE_DIR, "hdock_responses")  # Folder with the hdock_responses_*.csv files
+RESPONSE_STORE = os.path.join(BASE_DIR, "hdock_responses.sqlite")  # Compact store written by the importer
+KEEP_RAW_BODY = True  # Also keep each HTML page, zlib-compressed (False = job metadata and ID only)
+IMPORT_CHUNK_ROWS = 1000  # CSV rows parsed per batch, bounding memory on very large files
+# ============================================================
+
+# Job metadata columns kept from the response CSVs (missing columns are stored as NULL)
+METADATA_COLUMNS = ["receptor_file", "ligand_file", "email", "job_name"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    n_rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    source TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    receptor_file TEXT,
+    ligand_file TEXT,
+    email TEXT,
+    job_name TEXT,
+    download_ID TEXT NOT NULL,
+    body BLOB,
+    PRIMARY KEY (source, row)
+);
+CREATE INDEX IF NOT EXISTS responses_download_ID ON responses (download_ID);
+"""
+
+def open_store(store_path):
+    """Open (and create if needed) the response store."""
+    conn = sqlite3.connect(store_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+def _response_column(columns):
+    """Name of the HTML column ("Response" in the downloader's CSVs, "response" as written by 1_submit_jobs.js)."""
+    for column in columns:
+        if column.lower() == "response":
+            return column
+    raise KeyError("no Response column")
+
+def _compress(html):
+    """zlib-compressed UTF-8 body of a response (None for missing responses)."""
+    return zlib.compress(html.encode("utf-8")) if isinstance(html, str) else None
+
+def import_response_csv(conn, csv_file, keep_body=KEEP_RAW_BODY, workers=None, chunk_rows=IMPORT_CHUNK_ROWS, pool=None):
+    """
+    Import one response CSV into the store, replacing rows previously imported from
+    it. The job ID of every row is extracted once here (slow pages on pool, if given);
+    the HTML is dropped unless keep_body is set. Returns the number of rows imported.
+    """
+    source = os.path.basename(csv_file)
+    stat = os.stat(csv_file)
+    n_rows = 0
+    with conn:
+        conn.execute("DELETE FROM responses WHERE source = ?", (source,))
+        for chunk in pd.read_csv(csv_file, chunksize=chunk_rows):
+            response_column = _response_column(chunk.columns)
+            responses = chunk[response_column].tolist()
+            download_IDs = extract_job_ids(responses, workers=workers, pool=pool)
+            metadata = [
+                [None if pd.isna(value) else str(value) for value in chunk[column]]
+                if column in chunk.columns else [None] * len(chunk)
+                for column in METADATA_COLUMNS
+            ]
+            rows = [
+                (source, n_rows + i, *values, download_ID, _compress(html) if keep_body else None)
+                for i, (values, download_ID, html) in enumerate(zip(zip(*metadata), download_IDs, responses))
+            ]
+            conn.executemany("INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            n_rows += len(rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+            (source, stat.st_size, stat.st_mtime_ns, n_rows)
+        )
+    return n_rows
+
+def import_response_csvs(store_path, csv_files, keep_body=KEEP_RAW_BODY, workers=None):
+    """
+    Import every CSV in csv_files whose size or mtime changed since it was last
+    imported (unchanged files are skipped). One process pool (workers: None =
+    os.cpu_count(), 1 = serial) parses the slow pages of every chunk of every file,
+    instead of a pool being started per chunk. Returns the number of files imported.
+    """
+    conn = open_store(store_path)
+    workers = workers or os.cpu_count() or 1
+    # Worker processes are only started once a chunk has pages to parse
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        imported = {
+            source: (size, mtime_ns)
+            for source, size, mtime_ns in conn.execute("SELECT source, size, mtime_ns FROM sources")
+        }
+        n_imported = 0
+        for csv_file in sorted(csv_files):
+            stat = os.stat(csv_file)
+            if imported.get(os.path.basename(csv_file)) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            n_rows = import_response_csv(conn, csv_file, keep_body=keep_body, workers=workers, pool=pool)
+            print(f"📥 Imported {os.path.basename(csv_file)} ({n_rows} responses)")
+            n_imported += 1
+        return n_imported
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        conn.close()
+
+def load_responses(store_path):
+    """All stored responses as a DataFrame of job metadata and download_ID (no HTML)."""
+    conn = open_store(store_path)
+    try:
+        columns = ", ".join(["source", "row"] + METADATA_COLUMNS + ["download_ID"])
+        return pd.read_sql_query(f"SELECT {columns} FROM responses ORDER BY source, row", conn)
+    finally:
+        conn.close()
+
+def load_response_body(store_path, source, row):
+    """The raw HTML of one stored response, or None if it was imported without its body."""
+    conn = open_store(store_path)
+    try:
+        found = conn.execute("SELECT body FROM responses WHERE source = ? AND row = ?", (source, row)).fetchone()
+    finally:
+        conn.close()
+    if found is None or found[0] is None:
+        return None
+    return zlib.decompress(found[0]).decode("utf-8")
+
+if __name__ == "__main__":
+    # Convert the existing response CSVs into the compact store
+    csv_files = glob.glob(os.path.join(RESPONSES_DIR, "hdock_responses_*.csv"))
+    if not csv_files:
+        print(f"❌ No CSV files found in {RESPONSES_DIR}")
+    else:
+        n_imported = import_response_csvs(RESPONSE_STORE, csv_files)
+        print(f"✅ {n_imported} of {len(csv_files)} CSV files imported into {RESPONSE_STORE}")
@@ -0,0 +1,50 @@
+import io
+import os
+import tarfile
+from archive_extract import extract_archive, extract_archives
+
+
+def write_archive(path, job_id, n_files=3):
+    with tarfile.open(path, "w:gz") as tar:
+        for i in range(n_files):
+            data = f"ATOM  {i:5d}  CA  MET A   1      11.104  13.207   2.100\n".encode() * 500
+            info = tarfile.TarInfo(f"{job_id}/model_{i}.pdb")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def corrupt(path):
+    """Garble the start of the deflate stream, just after the gzip header."""
+    with open(path, "r+b") as f:
+        f.seek(30)
+        f.write(b"\xff" * 32)
+
+
+def test_corrupt_archive_does_not_stop_the_others(tmp_path):
+    output_dir = str(tmp_path)
+    paths = [os.path.join(output_dir, f"job{i}.tar.gz") for i in range(3)]
+    for i, path in enumerate(paths):
+        write_archive(path, f"job{i}")
+    corrupt(paths[1])
+
+    results = {os.path.basename(tar_file): success for tar_file, success, _ in extract_archives(paths, output_dir, workers=2)}
+
+    assert results == {"job0.tar.gz": True, "job1.tar.gz": False, "job2.tar.gz": True}
+    assert sorted(name for name in os.listdir(output_dir) if not name.endswith(".tar.gz")) == ["job0", "job2"]
+    # The failed archive is kept for another attempt
+    assert os.path.exists(paths[1])
+
+
+def test_member_filter_error_is_recorded(tmp_path):
+    output_dir = str(tmp_path)
+    path = os.path.join(output_dir, "job0.tar.gz")
+    write_archive(path, "job0")
+
+    def broken_filter(name):
+        raise ValueError("bad filter")
+
+    _, success, message = extract_archive(path, output_dir, broken_filter)
+
+    assert not success
+    assert message == "ValueError: bad filter"
+    assert os.listdir(output_dir) == ["job0.tar.gz"]
@@ -0,0 +1,157 @@
+import os
+import asyncio
+import aiohttp
+from aiohttp import web
+from async_downloader import download_file
+
+BODY = bytes(range(256)) * 4096  # 1 MiB
+
+
+async def serve(handler, scenario):
+    """Run handler on a localhost aiohttp server and await scenario(url) against it."""
+    app = web.Application()
+    app.router.add_get("/file", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        async with aiohttp.ClientSession(auto_decompress=False) as session:
+            return await scenario(session, f"http://127.0.0.1:{port}/file")
+    finally:
+        await runner.cleanup()
+
+
+def requested_offset(request):
+    """Start byte of a 'Range: bytes=N-' header, or 0."""
+    header = request.headers.get("Range", "")
+    return int(header[len("bytes="):-1]) if header.startswith("bytes=") else 0
+
+
+async def send_range(request, body=BODY):
+    """Answer with the requested range as a 206, or the whole body as a 200."""
+    offset = requested_offset(request)
+    if offset:
+        headers = {"Content-Range": f"bytes {offset}-{len(body) - 1}/{len(body)}"}
+        return web.Response(status=206, body=body[offset:], headers=headers)
+    return web.Response(body=body)
+
+
+async def send_truncated(request, body=BODY):
+    """Announce the whole body, send half of it and drop the connection."""
+    response = web.StreamResponse()
+    response.content_length = len(body)
+    await response.prepare(request)
+    await response.write(body[:len(body) // 2])
+    request.transport.close()
+    return response
+
+
+def run_download(handler, dest_path, max_attempts=3):
+    async def scenario(session, url):
+        return await download_file(session, url, dest_path, max_attempts=max_attempts)
+    return asyncio.run(serve(handler, scenario))
+
+
+def test_dropped_body_is_resumed_with_range(tmp_path):
+    dest = str(tmp_path / "job.tar.gz")
+    ranges = []
+
+    async def handler(request):
+        ranges.append(request.headers.get("Range"))
+        if len(ranges) == 1:
+            return await send_truncated(request)
+        return await send_range(request)
+
+    success, message, _, _ = run_download(handler, dest)
+    assert success, message
+    assert ranges[0] is None
+    assert ranges[1] == f"bytes={len(BODY) // 2}-"
+    assert open(dest, "rb").read() == BODY
+    assert not os.path.exists(f"{dest}.part")
+
+
+def test_range_ignored_restarts_from_zero(tmp_path):
+    dest = str(tmp_path / "job.tar.gz")
+    with open(f"{dest}.part", "wb") as f:
+        f.write(b"garbage")
+
+    async def handler(request):
+        return web.Response(body=BODY)
+
+    success, message, _, _ = run_download(handler, dest)
+    assert success, message
+    assert open(dest, "rb").read() == BODY
+
+
+def test_404_fails_without_retry(tmp_path):
+    dest = str(tmp_path / "job.tar.gz")
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        return web.Response(status=404)
+
+    success, message, _, _ = run_download(handler, dest)
+    assert not success
+    assert message == "HTTP 404"
+    assert len(calls) == 1
+    assert not os.path.exists(dest)
+
+
+def test_5xx_is_retried(tmp_path):
+    dest = str(tmp_path / "job.tar.gz")
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            return web.Response(status=503)
+        return web.Response(body=BODY)
+
+    success, message, _, _ = run_download(handler, dest)
+    assert success, message
+    assert len(calls) == 2
+    assert open(dest, "rb").read() == BODY
+
+
+def test_interrupted_transfer_leaves_no_final_file(tmp_path):
+    dest = str(tmp_path / "job.tar.gz")
+
+    async def handler(request):
+        return await send_truncated(request)
+
+    success, _, _, _ = run_download(handler, dest, max_attempts=1)
+    assert not success
+    assert not os.path.exists(dest)
+    # The partial body is kept under the .part name only, for a later resume
+    assert os.path.getsize(f"{dest}.part") == len(BODY) // 2
+
+
+def test_416_promotes_complete_part_file(tmp_path):
+    dest = str(tmp_path / "job.tar.gz")
+    with open(f"{dest}.part", "wb") as f:
+        f.write(BODY)
+
+    async def handler(request):
+        return web.Response(status=416, headers={"Content-Range": f"bytes */{len(BODY)}"})
+
+    success, message, _, _ = run_download(handler, dest)
+    assert success, message
+    assert open(dest, "rb").read() == BODY
+
+
+def test_416_with_stale_part_file_restarts(tmp_path):
+    dest = str(tmp_path / "job.tar.gz")
+    with open(f"{dest}.part", "wb") as f:
+        f.write(BODY + b"stale tail")
+
+    async def handler(request):
+        if requested_offset(request):
+            return web.Response(status=416, headers={"Content-Range": f"bytes */{len(BODY)}"})
+        return web.Response(body=BODY)
+
+    success, message, _, _ = run_download(handler, dest)
+    assert success, message
+    assert open(dest, "rb").read() == BODY
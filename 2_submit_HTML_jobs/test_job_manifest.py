@@ -0,0 +1,71 @@
+import os
+import job_manifest
+from job_manifest import update_job_manifest
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(data)
+
+
+def test_missing_jobs_do_not_rescan_others(tmp_path, monkeypatch):
+    output_dir = str(tmp_path / "out")
+    manifest_path = str(tmp_path / "manifest.json")
+    write(os.path.join(output_dir, "job0", "hdock_job0.out"), "x" * 10)
+    update_job_manifest(manifest_path, output_dir, ["job0"])
+
+    scanned = []
+    monkeypatch.setattr(job_manifest, "scan_job_folder", lambda path, download_ID: scanned.append(download_ID))
+    manifest = update_job_manifest(manifest_path, output_dir, ["job0", "never_downloaded"])
+
+    assert scanned == []
+    assert list(manifest["jobs"]) == ["job0"]
+    assert manifest["jobs"]["job0"]["has_out"]
+
+
+def test_recorded_jobs_are_trusted_unless_verifying(tmp_path, monkeypatch):
+    output_dir = str(tmp_path / "out")
+    manifest_path = str(tmp_path / "manifest.json")
+    out_file = os.path.join(output_dir, "job0", "hdock_job0.out")
+    write(out_file, "x" * 10)
+    folder_mtime = os.stat(os.path.dirname(out_file)).st_mtime_ns
+    assert update_job_manifest(manifest_path, output_dir, ["job0"])["jobs"]["job0"]["total_bytes"] == 10
+
+    with open(out_file, "a") as f:
+        f.write("y" * 5)
+    os.utime(os.path.dirname(out_file), ns=(folder_mtime, folder_mtime))
+
+    # Default: one stat of the job folder, which has not changed
+    stats = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda path, **kwargs: stats.append(path) or real_stat(path, **kwargs))
+    assert update_job_manifest(manifest_path, output_dir, ["job0"])["jobs"]["job0"]["total_bytes"] == 10
+    assert [path for path in stats if str(path).startswith(output_dir)] == [os.path.dirname(out_file)]
+    monkeypatch.undo()
+
+    # Verify mode stats the member files and notices the in-place change
+    assert update_job_manifest(manifest_path, output_dir, ["job0"], verify=True)["jobs"]["job0"]["total_bytes"] == 15
+
+
+def test_unrecorded_job_folder_is_added(tmp_path):
+    output_dir = str(tmp_path / "out")
+    manifest_path = str(tmp_path / "manifest.json")
+    update_job_manifest(manifest_path, output_dir, ["job0"])
+    write(os.path.join(output_dir, "job0", "hdock_job0.out"), "x")
+
+    entry = update_job_manifest(manifest_path, output_dir, ["job0"])["jobs"]["job0"]
+    assert entry["kind"] == "folder" and entry["has_out"]
+
+
+def test_removed_job_is_dropped(tmp_path):
+    output_dir = str(tmp_path / "out")
+    manifest_path = str(tmp_path / "manifest.json")
+    out_file = os.path.join(output_dir, "job0", "hdock_job0.out")
+    write(out_file, "x")
+    update_job_manifest(manifest_path, output_dir, ["job0"])
+
+    os.remove(out_file)
+    os.rmdir(os.path.dirname(out_file))
+
+    assert update_job_manifest(manifest_path, output_dir, ["job0"])["jobs"] == {}
@@ -0,0 +1,34 @@
+import pandas as pd
+import job_id_parser
+import response_store
+from response_store import import_response_csvs, load_responses
+
+
+def page(job_id, slow=False):
+    # A comment before the title sends the page to the BeautifulSoup path
+    head = "<!-- generated -->" if slow else ""
+    return f"<html><head>{head}<title>HDOCK Server: Job results for {job_id}</title></head></html>"
+
+
+def test_one_pool_parses_all_chunks_of_all_files(tmp_path, monkeypatch):
+    csv_files = []
+    for n in range(2):
+        csv_file = tmp_path / f"hdock_responses_{n}.csv"
+        pd.DataFrame({
+            "job_name": [f"job{n}_{i}" for i in range(5)],
+            "Response": [page(f"id{n}{i}", slow=i % 2 == 0) for i in range(5)],
+        }).to_csv(csv_file, index=False)
+        csv_files.append(str(csv_file))
+
+    pools = []
+    real_executor = response_store.ProcessPoolExecutor
+    monkeypatch.setattr(response_store, "ProcessPoolExecutor", lambda **kwargs: pools.append(kwargs) or real_executor(**kwargs))
+
+    def no_pool_per_chunk(**kwargs):
+        raise AssertionError("extract_job_ids started its own pool")
+    monkeypatch.setattr(job_id_parser, "ProcessPoolExecutor", no_pool_per_chunk)
+    store_path = str(tmp_path / "responses.sqlite")
+
+    assert import_response_csvs(store_path, csv_files, workers=2) == 2
+    assert len(pools) == 1
+    assert load_responses(store_path)["download_ID"].tolist() == [f"id{n}{i}" for n in range(2) for i in range(5)]
@@ -1,7 +1,12 @@
 import os
-import glob
+import json
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-import numpy as np
+from hdock_out_reader import read_out_file
+from hdock_out_metrics import PREFIX_CUTOFFS, pose_metrics, stream_out_metrics
+from hdock_out_index import load_out_index
+from hdock_archive_store import source_path
+from hdock_out_cache import cache_key, load_manifest, save_manifest, cached_read_out_file
 
 # ============================================================
 # Configuration Variables
@@ -10,88 +15,204 @@ data_dir = '/Users/nusin/Desktop/Hdock_results'
 ligand_folder = os.path.join(data_dir, 'hdock_output')
 mapped_csv_path = os.path.join(data_dir, 'mapped_ligands.csv')  # Updated file name
 output_csv_path = os.path.join(data_dir, 'hdock_out_parameters.csv')
+metrics_csv_path = os.path.join(data_dir, 'hdock_out_metrics.csv')  # Per-job metrics kept between runs
+metrics_state_path = os.path.join(data_dir, 'hdock_out_metrics_state.json')  # .out size/mtime seen by the last run
+full_rebuild = False  # True = recompute metrics for every job instead of only new/changed ones
+cache_folder = os.path.join(data_dir, 'hdock_out_cache')  # Parsed .out cache; set to None to always re-parse
+index_path = os.path.join(data_dir, 'hdock_out_index.json')  # Persisted download_ID -> .out index; None = rescan every run
+archive_index_path = None  # e.g. os.path.join(data_dir, 'hdock_archive_index.json') to read .out files from un-extracted *.tar.gz
+prefix_cutoffs = PREFIX_CUTOFFS  # avg<N> windows, e.g. [5, 10, 20, 100, 500, 1000]
+n_workers = None  # Worker processes for .out parsing (None = all CPUs, 1 = serial)
+stream_chunk_lines = None  # Set (e.g. 50000) to stream .out files in chunks with bounded memory (bypasses the cache)
 # ============================================================
 
-def process_out_files(ligand_folder):
+def extract_out_metrics(out_file, cache_folder=None, manifest=None, prefix_cutoffs=PREFIX_CUTOFFS, stream_chunk_lines=None):
     """
-    Process .out files to extract metrics for all parameters.
-    For each .out file (filename starting with 'hdock_' and ending with '.out'),
-    it extracts the download_ID from the file name and reads the file.
-    It calculates the following metrics for each parameter:
+    Read one hdock_<download_ID>.out file and compute the metrics for all parameters:
         - first value
-        - average of first 10 values
-        - average of first 100 values
-        - average of first 1000 values
+        - average of the first N values for each N in prefix_cutoffs (default 10, 100, 1000)
         - average of all values
-    Returns a DataFrame with one row per download_ID.
+    If cache_folder is given, the parsed poses are read through the cache and
+    manifest is updated in place. If stream_chunk_lines is given, the file is
+    instead read in chunks of that many lines and only the rows needed for the
+    largest cut-off are kept in memory.
+    Returns a dict (one metrics row), or None if the file could not be processed.
     """
-    # Recursively find all .out files in the given folder
-    all_out_files = sorted(glob.glob(os.path.join(ligand_folder, '**/*.out'), recursive=True))
+    basename = os.path.basename(out_file)
+    download_ID = basename[len('hdock_'):-len('.out')]
+    print(f"Processing download ID: {download_ID}")
     
-    # Define columns expected in the .out files
-    cols = [
-        "Translation_X", "Translation_Y", "Translation_Z", 
-        "Rotation_X", "Rotation_Y", "Rotation_Z", 
-        "Binding_Score", "RMSD", "Translational_ID"
-    ]
+    try:
+        result = {'download_ID': download_ID}
+        
+        # Very large files: keep running sums instead of the whole pose table.
+        if stream_chunk_lines:
+            result.update(stream_out_metrics(out_file, prefix_cutoffs, stream_chunk_lines))
+            return result
+        
+        # Read the .out file into a structured array (non-numeric fields become NaN).
+        if cache_folder:
+            poses = cached_read_out_file(out_file, cache_folder, manifest)
+        else:
+            poses = read_out_file(out_file)
+        
+        # Compute all metrics for all parameters from one prefix-sum pass.
+        result.update(pose_metrics(poses, prefix_cutoffs))
+        return result
+    except Exception as e:
+        print(f"Error processing {out_file}: {e}")
+        return None
+
+def _extract_out_metrics_task(task):
+    """Process-pool entry point: returns the metrics row and the worker's manifest entries."""
+    out_file, cache_folder, manifest, prefix_cutoffs, stream_chunk_lines = task
+    return extract_out_metrics(out_file, cache_folder, manifest, prefix_cutoffs, stream_chunk_lines), manifest
+
+def process_out_files(ligand_folder, cache_folder=None, workers=None, index_path=None, prefix_cutoffs=PREFIX_CUTOFFS,
+                      stream_chunk_lines=None, out_index=None, archive_index_path=None):
+    """
+    Process .out files to extract metrics for all parameters.
+    Every hdock_<download_ID>.out file is found through the download_ID index of
+    ligand_folder (persisted at index_path if given; with archive_index_path, .out
+    members of un-extracted archives are included) and its metrics are computed
+    (see extract_out_metrics; prefix_cutoffs sets the avg<N> windows).
+    If cache_folder is given, parsed poses are cached there and a file is
+    only re-parsed when its path, size or mtime changes. stream_chunk_lines
+    switches to the bounded-memory streaming reader instead.
+    workers is the number of worker processes (None = os.cpu_count(), 1 = serial).
+    The files are sharded across a process pool and the rows are merged back in
+    sorted file order, so the result is identical to the serial path.
+    If out_index is given, only the jobs it contains are processed.
+    Returns a DataFrame with one row per download_ID.
+    """
+    # Look up every job's .out file through the download_ID index (one os.scandir walk)
+    if out_index is None:
+        out_index = load_out_index(ligand_folder, index_path, archive_index_path=archive_index_path)
+    out_files = sorted(out_index.values())
     
-    results = []
+    manifest = load_manifest(cache_folder) if cache_folder else None
+    workers = workers or os.cpu_count() or 1
     
-    for out_file in all_out_files:
-        basename = os.path.basename(out_file)
-        # Only process files that follow the expected naming convention
-        if not (basename.startswith('hdock_') and basename.endswith('.out')):
-            print(f"Skipping unexpected file: {basename}")
-            continue
-        
-        download_ID = basename[len('hdock_'):-len('.out')]
-        print(f"Processing download ID: {download_ID}")
+    if workers == 1 or len(out_files) < 2:
+        results = [extract_out_metrics(out_file, cache_folder, manifest, prefix_cutoffs, stream_chunk_lines)
+                   for out_file in out_files]
+    else:
+        # Only ship each worker the manifest entry of its own file
+        tasks = []
+        for out_file in out_files:
+            key = cache_key(out_file)
+            entry = {key: manifest[key]} if cache_folder and key in manifest else {}
+            tasks.append((out_file, cache_folder, entry, prefix_cutoffs, stream_chunk_lines))
         
-        try:
-            # Read the .out file using whitespace as the delimiter.
-            df_out = pd.read_csv(
-                out_file, 
-                sep='\s+', 
-                header=None, 
-                names=cols, 
-                engine='python', 
-                on_bad_lines='skip'
-            )
-            
-            result = {'download_ID': download_ID}
-            
-            # For each parameter, compute the desired metrics.
-            for param in cols:
-                series = pd.to_numeric(df_out[param], errors='coerce').dropna()
-                result[f'first_{param}'] = series.iloc[0] if len(series) > 0 else np.nan
-                result[f'avg10_{param}'] = series.iloc[:10].mean() if len(series) > 0 else np.nan
-                result[f'avg100_{param}'] = series.iloc[:100].mean() if len(series) > 0 else np.nan
-                result[f'avg1000_{param}'] = series.iloc[:1000].mean() if len(series) > 0 else np.nan
-                result[f'avgAll_{param}'] = series.mean() if len(series) > 0 else np.nan
-                
-            results.append(result)
-        except Exception as e:
-            print(f"Error processing {out_file}: {e}")
-            continue
+        results = []
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # pool.map yields in submission order, which keeps the serial row order
+            for result, entry in pool.map(_extract_out_metrics_task, tasks, chunksize=chunksize):
+                results.append(result)
+                if cache_folder:
+                    manifest.update(entry)
     
-    return pd.DataFrame(results)
+    if cache_folder:
+        save_manifest(cache_folder, manifest)
+    
+    return pd.DataFrame([result for result in results if result is not None])
 
-# Process all .out files to get the computed metrics DataFrame.
-metrics_df = process_out_files(ligand_folder)
+def _out_file_signature(out_file):
+    """Size and mtime of an .out file, used to detect changed jobs between runs."""
+    stat = os.stat(source_path(out_file))
+    return {'path': os.path.abspath(out_file), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
 
-# Read the original mapped CSV file.
-mapped_df = pd.read_csv(mapped_csv_path)
+def update_out_metrics(ligand_folder, metrics_csv_path, state_path, full_rebuild=False, index_path=None,
+                       archive_index_path=None, prefix_cutoffs=PREFIX_CUTOFFS, **process_kwargs):
+    """
+    Incrementally maintain the per-job metrics table at metrics_csv_path.
+    state_path records the path, size and mtime of every .out file processed in the
+    last run. Only download_IDs that are new or whose .out file changed are processed
+    (see process_out_files); rows of unchanged jobs are reused and rows of jobs whose
+    .out file disappeared are dropped. A full rebuild happens when full_rebuild is set,
+    when there is no previous table/state, or when prefix_cutoffs changed.
+    Returns the complete metrics DataFrame, one row per download_ID.
+    """
+    out_index = load_out_index(ligand_folder, index_path, archive_index_path=archive_index_path)
+    signatures = {download_ID: _out_file_signature(out_file) for download_ID, out_file in out_index.items()}
+    
+    state = None
+    if not full_rebuild and os.path.exists(state_path) and os.path.exists(metrics_csv_path):
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        if state.get('prefix_cutoffs') != list(prefix_cutoffs):
+            print("Metric windows changed since the last run, rebuilding all metrics.")
+            state = None
+    
+    if state is None:
+        old_metrics = None
+        todo = out_index
+    else:
+        old_files = state['files']
+        todo = {download_ID: out_index[download_ID] for download_ID, signature in signatures.items()
+                if old_files.get(download_ID) != signature}
+        old_metrics = pd.read_csv(metrics_csv_path, dtype={'download_ID': str}, float_precision='round_trip')
+        keep = old_metrics['download_ID'].isin(signatures) & ~old_metrics['download_ID'].isin(todo)
+        print(f"Incremental update: {len(todo)} new or changed jobs, "
+              f"{int(keep.sum())} unchanged, {int((~old_metrics['download_ID'].isin(signatures)).sum())} removed.")
+        old_metrics = old_metrics[keep]
+    
+    new_metrics = process_out_files(
+        ligand_folder,
+        prefix_cutoffs=prefix_cutoffs,
+        out_index=todo,
+        **process_kwargs
+    )
+    
+    frames = [df for df in (old_metrics, new_metrics) if df is not None and not df.empty]
+    metrics_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['download_ID'])
+    # Same row order as a full rebuild (sorted by .out path)
+    metrics_df = metrics_df.sort_values('download_ID', key=lambda ids: ids.map(out_index), kind='stable')
+    metrics_df = metrics_df.reset_index(drop=True)
+    metrics_df.to_csv(metrics_csv_path, index=False)
+    
+    # Jobs that failed to process are left out of the state so they are retried next run
+    processed = set(metrics_df['download_ID'])
+    state = {
+        'prefix_cutoffs': list(prefix_cutoffs),
+        'files': {download_ID: signature for download_ID, signature in signatures.items() if download_ID in processed}
+    }
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+    
+    return metrics_df
+
+if __name__ == "__main__":
+    # Compute metrics for new or changed .out files only (or everything on a full rebuild).
+    metrics_df = update_out_metrics(
+        ligand_folder,
+        metrics_csv_path,
+        metrics_state_path,
+        full_rebuild=full_rebuild,
+        index_path=index_path,
+        archive_index_path=archive_index_path,
+        prefix_cutoffs=prefix_cutoffs,
+        cache_folder=cache_folder,
+        workers=n_workers,
+        stream_chunk_lines=stream_chunk_lines
+    )
+    
+    # Read the original mapped CSV file.
+    mapped_df = pd.read_csv(mapped_csv_path)
 
-# Merge the computed metrics with the mapped CSV data on the download_ID column.
-# Using a left join to preserve all columns from mapped_df.
-merged_df = pd.merge(mapped_df, metrics_df, on="download_ID", how="left")
+    # Merge the computed metrics with the mapped CSV data on the download_ID column.
+    # Using a left join to preserve all columns from mapped_df.
+    merged_df = pd.merge(mapped_df, metrics_df, on="download_ID", how="left")
 
-# Reorder columns: first all columns from mapped_df, then any additional columns (metrics)
-mapped_columns = mapped_df.columns.tolist()
-additional_columns = [col for col in merged_df.columns if col not in mapped_columns]
-merged_df = merged_df[mapped_columns + additional_columns]
+    # Reorder columns: first all columns from mapped_df, then any additional columns (metrics)
+    mapped_columns = mapped_df.columns.tolist()
+    additional_columns = [col for col in merged_df.columns if col not in mapped_columns]
+    merged_df = merged_df[mapped_columns + additional_columns]
 
-# Write the merged DataFrame to a new CSV file.
-merged_df.to_csv(output_csv_path, index=False)
+    # Write the merged DataFrame to a new CSV file.
+    merged_df.to_csv(output_csv_path, index=False)
 
-print("hdock_out_parameters.csv has been created.")
+    print("hdock_out_parameters.csv has been created.")
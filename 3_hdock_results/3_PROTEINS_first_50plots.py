@@ -1,7 +1,13 @@
 import os
-import glob
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Headless backend: figures are only written to disk
 import matplotlib.pyplot as plt
+from hdock_out_reader import OUT_COLUMNS, read_out_file
+from hdock_out_index import load_out_index
+from hdock_out_cache import load_manifest, save_manifest, cached_read_out_file
 
 # ============================================================
 # Configuration Variables
@@ -10,100 +16,154 @@ data_dir = '/Users/nusin/Desktop/Hdock_results'
 base_folder = os.path.join(data_dir, 'hdock_output')  # Folder containing all hdock .out files
 hdock_out_parameters_csv_path = os.path.join(data_dir, 'hdock_out_parameters.csv')  # Input CSV with protein information
 plot_folder = os.path.join(data_dir, 'protein_plots')   # Output folder for protein plots
+cache_folder = os.path.join(data_dir, 'hdock_out_cache')  # Parsed .out cache; set to None to always re-parse
+index_path = os.path.join(data_dir, 'hdock_out_index.json')  # Persisted download_ID -> .out index; None = rescan every run
+archive_index_path = None  # e.g. os.path.join(data_dir, 'hdock_archive_index.json') to read .out files from un-extracted *.tar.gz
+n_workers = None  # Worker processes for rendering (None = all CPUs, 1 = serial)
 # ============================================================
 
 # Define columns expected in the .out files
-cols = [
-    "Translation_X", "Translation_Y", "Translation_Z", 
-    "Rotation_X", "Rotation_Y", "Rotation_Z", 
-    "Binding_Score", "RMSD", "Translational_ID"
-]
-
-# Read the input CSV file for protein information
-mapped_df = pd.read_csv(hdock_out_parameters_csv_path)
-
-# Create an output directory for protein plots if it doesn't exist
-os.makedirs(plot_folder, exist_ok=True)
-
-# Group the CSV by gene_symbol so that all rows with the same gene are in one graph
-for gene, group_df in mapped_df.groupby("gene_symbol"):
-    # Get protein_name and short_name from the first row of the group (if available)
-    first_row = group_df.iloc[0]
-    protein_name = first_row.get('protein_name', 'Unknown')
-    short_name = first_row.get('short_name', '')
-    if pd.isna(short_name) or short_name == '':
-        protein_title = protein_name
-    else:
-        protein_title = f"{protein_name}, ({short_name})"
-    
-    # Create a figure with 9 subplots (3 rows x 3 columns)
-    fig, axes = plt.subplots(3, 3, figsize=(15, 12))
-    # Set suptitle as requested:
-    fig.suptitle(f"First 50 entries for protein: {protein_title}\nGene involved: {gene}", fontsize=16)
-    
-    # Initialize a dictionary to track plotted JobNames for each parameter (one per subplot)
-    plotted_labels = {i: set() for i in range(len(cols))}
-    
-    # Process each row in the group (each corresponds to one JobName)
+cols = OUT_COLUMNS
+N_ENTRIES = 50  # Poses plotted per job
+
+# Figure and axes reused by every gene rendered in this process
+_figure = None
+_axes = None
+
+def load_gene_jobs(group_df, out_index, cache_folder=None, manifest=None):
+    """
+    Return [(JobName, first 50 poses)] for the rows of one gene, reading each job's
+    .out file once (through the parsed-pose cache if cache_folder is given).
+    """
+    jobs = []
     for idx, row in group_df.iterrows():
         download_ID = row['download_ID']
         jobName = row['JobName']
-        
-        # Search for the corresponding .out file using a recursive glob pattern.
-        out_pattern = os.path.join(base_folder, '**', f'hdock_{download_ID}.out')
-        out_files = glob.glob(out_pattern, recursive=True)
-        
-        if not out_files:
+
+        # Look up the corresponding .out file in the download_ID index.
+        out_file = out_index.get(str(download_ID))
+
+        if out_file is None:
             print(f"No .out file found for download_ID: {download_ID}")
             continue
-        
-        out_file = out_files[0]  # Use the first matching file
-        print(f"Processing gene: {gene}, JobName: {jobName}, download_ID: {download_ID} from file: {out_file}")
-        
+
+        print(f"Loading JobName: {jobName}, download_ID: {download_ID} from file: {out_file}")
+
         try:
             # Read the .out file. Lines starting with '#' are treated as comments.
-            df_out = pd.read_csv(
-                out_file, 
-                sep='\s+', 
-                header=None, 
-                names=cols, 
-                engine='python', 
-                on_bad_lines='skip',
-                comment='#'
-            )
+            if cache_folder:
+                poses = cached_read_out_file(out_file, cache_folder, manifest, comment='#')
+            else:
+                poses = read_out_file(out_file, comment='#')
         except Exception as e:
             print(f"Error reading {out_file}: {e}")
             continue
-        
-        # Extract the first 50 entries (or as many as available)
-        df_first50 = df_out.head(50)
-        
+
+        # Keep only the first 50 entries (or as many as available)
+        jobs.append((jobName, poses[:N_ENTRIES].copy()))
+    return jobs
+
+def render_gene_plot(gene, protein_title, jobs, plot_folder):
+    """
+    Draw the 3x3 first-50 plot of one gene from already-parsed poses and save it.
+    The figure and axes are created once per process and cleared between genes.
+    """
+    global _figure, _axes
+    if _figure is None:
+        # Create a figure with 9 subplots (3 rows x 3 columns)
+        _figure, _axes = plt.subplots(3, 3, figsize=(15, 12))
+    fig, axes = _figure, _axes
+    for ax in axes.flat:
+        ax.cla()
+
+    # Set suptitle as requested:
+    fig.suptitle(f"First 50 entries for protein: {protein_title}\nGene involved: {gene}", fontsize=16)
+
+    # Initialize a dictionary to track plotted JobNames for each parameter (one per subplot)
+    plotted_labels = {i: set() for i in range(len(cols))}
+
+    for jobName, first50 in jobs:
+        entries = np.arange(len(first50))
+
         # Loop over each parameter and plot its values on the corresponding subplot
         for i, param in enumerate(cols):
             ax = axes[i // 3, i % 3]
-            # Convert values to numeric (non-numeric become NaN) and plot
-            values = pd.to_numeric(df_first50[param], errors='coerce')
+            # Non-numeric values are already NaN in the parsed array
+            values = first50[param]
             # Only add label if this JobName hasn't been plotted yet in this subplot
             if jobName not in plotted_labels[i]:
-                ax.plot(df_first50.index, values, marker='o', linestyle='-', label=jobName)
+                ax.plot(entries, values, marker='o', linestyle='-', label=jobName)
                 plotted_labels[i].add(jobName)
             else:
-                ax.plot(df_first50.index, values, marker='o', linestyle='-')
-            ax.set_title(param)
-            ax.set_xlabel("Entry")
-            ax.set_ylabel(param)
-    
-    # Add legends to each subplot so the lines are labeled with JobName
-    for i in range(3):
-        for j in range(3):
-            axes[i, j].legend()
-    
-    plt.tight_layout(rect=[0, 0, 1, 0.96])  # Adjust layout to include the suptitle
-    
+                ax.plot(entries, values, marker='o', linestyle='-')
+
+    for i, param in enumerate(cols):
+        ax = axes[i // 3, i % 3]
+        ax.set_title(param)
+        ax.set_xlabel("Entry")
+        ax.set_ylabel(param)
+        # Add legends to each subplot so the lines are labeled with JobName
+        if plotted_labels[i]:
+            ax.legend()
+
+    fig.tight_layout(rect=[0, 0, 1, 0.96])  # Adjust layout to include the suptitle
+
     # Save the figure with the gene_symbol in the filename
     plot_filename = os.path.join(plot_folder, f"{gene}_first50.png")
-    plt.savefig(plot_filename)
-    plt.close()
+    fig.savefig(plot_filename)
     print(f"Saved plot for gene {gene} to {plot_filename}")
+    return plot_filename
+
+def _render_gene_plot_task(task):
+    """Process-pool entry point for render_gene_plot."""
+    return render_gene_plot(*task)
+
+def render_protein_plots(mapped_df, out_index, plot_folder, cache_folder=None, workers=None):
+    """
+    Render one first-50 plot per gene_symbol.
+    All poses are loaded up front (once per job, through the cache); the genes are
+    then spread across a process pool (workers: None = os.cpu_count(), 1 = serial),
+    each worker reusing a single figure.
+    """
+    manifest = load_manifest(cache_folder) if cache_folder else None
+
+    # Group the CSV by gene_symbol so that all rows with the same gene are in one graph
+    tasks = []
+    for gene, group_df in mapped_df.groupby("gene_symbol"):
+        # Get protein_name and short_name from the first row of the group (if available)
+        first_row = group_df.iloc[0]
+        protein_name = first_row.get('protein_name', 'Unknown')
+        short_name = first_row.get('short_name', '')
+        if pd.isna(short_name) or short_name == '':
+            protein_title = protein_name
+        else:
+            protein_title = f"{protein_name}, ({short_name})"
+
+        print(f"Processing gene: {gene}")
+        jobs = load_gene_jobs(group_df, out_index, cache_folder, manifest)
+        tasks.append((gene, protein_title, jobs, plot_folder))
+
+    if cache_folder:
+        save_manifest(cache_folder, manifest)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        return [render_gene_plot(*task) for task in tasks]
+
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_gene_plot_task, tasks, chunksize=chunksize))
+
+if __name__ == "__main__":
+    # Read the input CSV file for protein information
+    mapped_df = pd.read_csv(hdock_out_parameters_csv_path)
+
+    # Create an output directory for protein plots if it doesn't exist
+    os.makedirs(plot_folder, exist_ok=True)
+
+    # Index every job's .out file once (a single os.scandir walk of the output tree)
+    out_index = load_out_index(base_folder, index_path, archive_index_path=archive_index_path)
+
+    render_protein_plots(mapped_df, out_index, plot_folder, cache_folder=cache_folder, workers=n_workers)
 
-print("All grouped protein plots have been generated and saved in the 'protein_plots' folder.")
+    print("All grouped protein plots have been generated and saved in the 'protein_plots' folder.")
@@ -1,5 +1,9 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Headless backend: figures are only written to disk
 import matplotlib.pyplot as plt
 
 # ============================================================
@@ -8,57 +12,124 @@ import matplotlib.pyplot as plt
 data_dir = '/Users/nusin/Desktop/Hdock_results'
 input_csv_path = os.path.join(data_dir, 'hdock_out_parameters.csv')
 output_folder = os.path.join(data_dir, 'parameter_plots')
-os.makedirs(output_folder, exist_ok=True)
+top_n = 50  # Proteins shown per chart
+n_workers = None  # Worker processes for rendering (None = all CPUs, 1 = serial)
 # ============================================================
 
 # Define the parameters we want to plot
 params = [
-    "Translation_X", "Translation_Y", "Translation_Z", 
-    "Rotation_X", "Rotation_Y", "Rotation_Z", 
+    "Translation_X", "Translation_Y", "Translation_Z",
+    "Rotation_X", "Rotation_Y", "Rotation_Z",
     "Binding_Score", "RMSD", "Translational_ID"
 ]
 
 # Define the metric types to plot
 metrics = ["first", "avg10", "avg100", "avg1000"]
 
-# Load the CSV file that includes computed metrics.
-df = pd.read_csv(input_csv_path)
-
-# Loop over each metric type and parameter
-for metric in metrics:
-    for param in params:
-        col_name = f"{metric}_{param}"
-        if col_name not in df.columns:
-            print(f"Column {col_name} not found in the DataFrame. Skipping...")
-            continue
-
-        # Sort proteins by the metric column (ascending: lower scores are better)
-        df_sorted = df.sort_values(by=col_name, ascending=True)
-        df_top50 = df_sorted.head(50)
-
-        # Use only short_name as label if exists; otherwise, use protein_name; otherwise, use download_ID
-        if "short_name" in df_top50.columns:
-            labels = df_top50["short_name"].astype(str)
-        elif "protein_name" in df_top50.columns:
-            labels = df_top50["protein_name"].astype(str)
+# Figure reused by every chart rendered in this process
+_figure = None
+
+def select_top_k(df, col_names, k):
+    """
+    Return {col_name: row positions of the k lowest values, best first} for all
+    columns at once. One np.partition over the (rows x columns) matrix finds each
+    column's k-th value, so only the <= k selected rows per column are sorted.
+    The result matches df.sort_values(col_name, kind='stable').head(k):
+    ties keep their row order and NaN values come last.
+    """
+    values = df[col_names].to_numpy(dtype=np.float64)
+    n_rows = len(values)
+    k = min(k, n_rows)
+    if k == 0:
+        return {col_name: np.empty(0, dtype=np.int64) for col_name in col_names}
+
+    # NaN sorts last in np.partition, as in sort_values
+    kth_values = np.partition(values, k - 1, axis=0)[k - 1]
+
+    selections = {}
+    for j, col_name in enumerate(col_names):
+        column = values[:, j]
+        kth = kth_values[j]
+        if np.isnan(kth):
+            below = np.flatnonzero(~np.isnan(column))
+            equal = np.flatnonzero(np.isnan(column))
         else:
-            labels = df_top50["download_ID"].astype(str)
+            below = np.flatnonzero(column < kth)
+            equal = np.flatnonzero(column == kth)
+        # Ties at the k-th value are taken in row order
+        selected = np.concatenate([below, equal[:k - len(below)]])
+        selections[col_name] = selected[np.argsort(column[selected], kind='stable')]
+    return selections
+
+def render_ranking_plot(col_name, labels, values, output_file):
+    """Draw and save one horizontal bar chart of the top proteins for col_name."""
+    global _figure
+    if _figure is None:
+        _figure = plt.figure(figsize=(10, 8))
+    fig = _figure
+    fig.clf()
+    ax = fig.add_subplot()
+
+    # Create a horizontal bar plot
+    ax.barh(labels, values, color='skyblue')
+    ax.set_xlabel(col_name)
+    ax.set_title(f"Top {top_n} Proteins by {col_name}")
+    ax.invert_yaxis()  # Invert y-axis so the best (lowest) scores are at the top
+    fig.tight_layout()
+
+    # Save the plot
+    fig.savefig(output_file)
+    print(f"Saved plot for {col_name} to {output_file}")
+    return output_file
+
+def _render_ranking_plot_task(task):
+    """Process-pool entry point for render_ranking_plot."""
+    return render_ranking_plot(*task)
+
+def render_parameter_plots(df, output_folder, workers=None):
+    """
+    Select the top proteins for every metric/parameter column in one pass and
+    render the charts across a process pool (workers: None = os.cpu_count(), 1 = serial).
+    """
+    col_names = []
+    for metric in metrics:
+        for param in params:
+            col_name = f"{metric}_{param}"
+            if col_name not in df.columns:
+                print(f"Column {col_name} not found in the DataFrame. Skipping...")
+                continue
+            col_names.append(col_name)
+
+    # Use only short_name as label if exists; otherwise, use protein_name; otherwise, use download_ID
+    if "short_name" in df.columns:
+        all_labels = df["short_name"].astype(str).to_numpy()
+    elif "protein_name" in df.columns:
+        all_labels = df["protein_name"].astype(str).to_numpy()
+    else:
+        all_labels = df["download_ID"].astype(str).to_numpy()
+
+    # Lower scores are better, so rank ascending
+    selections = select_top_k(df, col_names, top_n)
+
+    tasks = []
+    for col_name in col_names:
+        rows = selections[col_name]
+        output_file = os.path.join(output_folder, f"{col_name}_top{top_n}.png")
+        tasks.append((col_name, all_labels[rows], df[col_name].to_numpy()[rows], output_file))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        return [render_ranking_plot(*task) for task in tasks]
 
-        values = df_top50[col_name]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_ranking_plot_task, tasks))
 
-        # Create a horizontal bar plot
-        plt.figure(figsize=(10, 8))
-        plt.barh(labels, values, color='skyblue')
-        plt.xlabel(col_name)
-        plt.title(f"Top 50 Proteins by {col_name}")
-        plt.gca().invert_yaxis()  # Invert y-axis so the best (lowest) scores are at the top
-        plt.tight_layout()
+if __name__ == "__main__":
+    os.makedirs(output_folder, exist_ok=True)
 
-        # Save the plot
-        output_file = os.path.join(output_folder, f"{col_name}_top50.png")
-        plt.savefig(output_file)
-        plt.close()
+    # Load the CSV file that includes computed metrics.
+    df = pd.read_csv(input_csv_path)
 
-        print(f"Saved plot for {col_name} to {output_file}")
+    render_parameter_plots(df, output_folder, workers=n_workers)
 
-print(f"All parameter plots have been generated and saved in '{output_folder}'.")
+    print(f"All parameter plots have been generated and saved in '{output_folder}'.")
@@ -0,0 +1,70 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from hdock_out_reader import OUT_COLUMNS, read_out_file, pose_matrix
+
+# ============================================================
+# Configuration Variables
+# ============================================================
+N_FILES = 20        # Number of synthetic .out files
+N_POSES = 10000     # Poses per file
+SEED = 0
+# ============================================================
+
+def write_synthetic_out_file(path, n_poses, rng):
+    """Write an HDOCK-like .out file: a few header lines followed by n_poses pose lines."""
+    header = [
+        "  0.600000     15",
+        "receptor.pdb",
+        "ligand.pdb",
+        "  12.345  -4.567  8.901",
+        "  -1.234   5.678  0.123",
+    ]
+    transforms = rng.uniform(-60, 60, size=(n_poses, 6))
+    scores = np.sort(rng.uniform(-350, -100, size=n_poses))
+    rmsd = rng.uniform(0, 80, size=n_poses)
+    trans_id = rng.integers(1, 60000, size=n_poses)
+    with open(path, 'w') as f:
+        f.write("\n".join(header) + "\n")
+        for t, s, r, tid in zip(transforms, scores, rmsd, trans_id):
+            f.write("  " + "  ".join(f"{v:.3f}" for v in t) + f"  {s:.2f}  {r:.2f}  {tid}\n")
+
+def read_with_pandas(path):
+    """The read used by the stage-3 scripts before hdock_out_reader existed."""
+    df_out = pd.read_csv(
+        path,
+        sep='\\s+',
+        header=None,
+        names=OUT_COLUMNS,
+        engine='python',
+        on_bad_lines='skip'
+    )
+    return np.column_stack([pd.to_numeric(df_out[col], errors='coerce').to_numpy(np.float64) for col in OUT_COLUMNS])
+
+def time_reader(reader, paths):
+    start = time.perf_counter()
+    for path in paths:
+        reader(path)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(SEED)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [os.path.join(tmp_dir, f"hdock_{i}.out") for i in range(N_FILES)]
+        for path in paths:
+            write_synthetic_out_file(path, N_POSES, rng)
+
+        # Both readers must produce the same values before timing means anything
+        for path in paths:
+            if not np.array_equal(read_with_pandas(path), pose_matrix(read_out_file(path)), equal_nan=True):
+                raise SystemExit(f"Parsed values differ for {path}")
+
+        t_pandas = time_reader(read_with_pandas, paths)
+        t_numpy = time_reader(read_out_file, paths)
+
+    print(f"Files: {N_FILES} x {N_POSES} poses")
+    print(f"pd.read_csv(engine='python'): {t_pandas:.3f} s ({t_pandas / N_FILES * 1000:.1f} ms/file)")
+    print(f"read_out_file:                {t_numpy:.3f} s ({t_numpy / N_FILES * 1000:.1f} ms/file)")
+    print(f"Speed-up: {t_pandas / t_numpy:.1f}x")
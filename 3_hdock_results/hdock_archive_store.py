@@ -0,0 +1,144 @@
+import os
+import gzip
+import json
+import shutil
+import tarfile
+import tempfile
+
+# ============================================================
+# Archive member sources
+# ============================================================
+# A .out file kept inside an all_results archive is addressed as
+#     "<archive path>::<member copy>::/<member name>"
+# The member copy is the .out member recompressed on its own (gzip) when the
+# archive is indexed, so reading it never decompresses the rest of the archive.
+# The archive itself stays the source file whose size and mtime are tracked.
+# The '/' before the member name keeps os.path.basename() of a source equal to
+# hdock_<download_ID>.out, even for a member at the top level of the tar.
+ARCHIVE_SEP = '::'
+ARCHIVE_SUFFIX = '.tar.gz'
+MEMBERS_SUFFIX = '_members'  # Member copies live in '<archive index path without .json>_members/'
+CHUNK_SIZE = 1024 * 1024
+# ============================================================
+
+def is_archive_source(source):
+    """True if source points at a member inside an archive rather than a file on disk."""
+    return ARCHIVE_SEP in source
+
+def make_archive_source(archive, member_copy, member):
+    """Build the source string of an archive member (see ARCHIVE_SEP)."""
+    return f"{archive}{ARCHIVE_SEP}{member_copy}{ARCHIVE_SEP}/{member}"
+
+def split_archive_source(source):
+    """Return (archive, member copy, member) for an archive member source."""
+    archive, member_copy, member = source.split(ARCHIVE_SEP, 2)
+    return archive, member_copy, member[1:]
+
+def source_path(source):
+    """File on disk that holds source (the archive for archive members)."""
+    return split_archive_source(source)[0] if is_archive_source(source) else source
+
+def open_out_source(source):
+    """Open an .out file or an archive member source for reading as text."""
+    if not is_archive_source(source):
+        return open(source, 'r', errors='replace')
+    return gzip.open(split_archive_source(source)[1], 'rt', errors='replace')
+
+def archive_download_ID(tar_file):
+    """download_ID of an archive, from its '<download_ID>.tar.gz' file name."""
+    return os.path.basename(tar_file)[:-len(ARCHIVE_SUFFIX)]
+
+def index_archive(tar_file, copy_folder):
+    """
+    Read an archive once, recompressing its hdock_<download_ID>.out member (the
+    download_ID is taken from the archive name) into copy_folder as a gzip file of
+    its own. Members whose name does not match are skipped.
+    Returns ({download_ID: [member copy name, member name]}, number of regular files).
+    """
+    download_ID = archive_download_ID(tar_file)
+    out_name = f"hdock_{download_ID}.out"
+    out_members = {}
+    n_files = 0
+    os.makedirs(copy_folder, exist_ok=True)
+    # One sequential pass: the archive is decompressed once, whatever its size
+    with tarfile.open(tar_file, 'r|gz') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            n_files += 1
+            basename = os.path.basename(member.name)
+            if not (basename.startswith('hdock_') and basename.endswith('.out')):
+                continue
+            if basename != out_name:
+                print(f"Skipping {member.name} in {os.path.basename(tar_file)}: expected {out_name}")
+                continue
+            copy_name = f"{out_name}.gz"
+            copy_path = os.path.join(copy_folder, copy_name)
+            with tar.extractfile(member) as src, gzip.open(f"{copy_path}.tmp", 'wb') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            os.replace(f"{copy_path}.tmp", copy_path)
+            out_members[download_ID] = [copy_name, member.name]
+    return out_members, n_files
+
+def _copies_present(copy_folder, members):
+    """True if every member copy listed for an archive is in copy_folder (False for older index entries)."""
+    return isinstance(members, dict) and all(
+        len(value) == 2 and os.path.exists(os.path.join(copy_folder, value[0])) for value in members.values()
+    )
+
+def load_archive_index(base_folder, index_path=None):
+    """
+    Map download_IDs to the .out members of the *.tar.gz archives directly in base_folder.
+    Each archive is read once and its .out member recompressed into the member store
+    ('<index_path stem>_members/', a temporary folder without index_path); with
+    index_path, an archive is only re-read when its size or mtime changes.
+    Copies of archives that are gone are removed.
+    """
+    saved = {}
+    if index_path and os.path.exists(index_path):
+        try:
+            with open(index_path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable archive index {index_path}: {e}")
+    members_dir = f"{os.path.splitext(index_path)[0]}{MEMBERS_SUFFIX}" if index_path else tempfile.mkdtemp(prefix='hdock_archive_members_')
+
+    archives = {}
+    with os.scandir(base_folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(ARCHIVE_SUFFIX) and not entry.name.startswith('.'):
+                stat = entry.stat()
+                signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                copy_folder = os.path.join(members_dir, entry.name)
+                previous = saved.get(entry.name)
+                if previous and previous['size'] == signature['size'] and previous['mtime_ns'] == signature['mtime_ns'] \
+                        and _copies_present(copy_folder, previous.get('members')):
+                    archives[entry.name] = previous
+                    continue
+                print(f"Indexing archive {entry.name}...")
+                try:
+                    members, n_files = index_archive(entry.path, copy_folder)
+                except (tarfile.TarError, EOFError, OSError) as e:
+                    print(f"Cannot index {entry.name}: {e}")
+                    continue
+                archives[entry.name] = dict(signature, n_files=n_files, members=members)
+
+    # Drop the member copies of archives that were removed
+    if os.path.isdir(members_dir):
+        for name in os.listdir(members_dir):
+            if name not in archives:
+                shutil.rmtree(os.path.join(members_dir, name), ignore_errors=True)
+
+    if index_path:
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(archives, f)
+        os.replace(tmp_path, index_path)
+
+    archive_index = {}
+    for name in sorted(archives):
+        archive = os.path.join(base_folder, name)
+        for download_ID, (copy_name, member) in archives[name]['members'].items():
+            member_copy = os.path.join(members_dir, name, copy_name)
+            archive_index.setdefault(download_ID, make_archive_source(archive, member_copy, member))
+    return archive_index
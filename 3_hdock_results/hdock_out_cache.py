@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+from hdock_out_reader import read_out_file
+from hdock_archive_store import source_path
+
+# ============================================================
+# Parsed-pose cache layout
+# ============================================================
+# <cache_folder>/<key>.npy      POSE_DTYPE structured array for one .out file, with
+#                               key = <download_ID>__<hash of the .out path>[__c<comment>]
+# <cache_folder>/manifest.json  {key: {"path", "size", "mtime_ns"}} of the parsed source
+MANIFEST_NAME = 'manifest.json'
+# ============================================================
+
+def cache_key(out_file, comment=None):
+    """
+    Cache key for one .out file: its download_ID plus a hash of its absolute path, so
+    two .out files with the same download_ID (e.g. in different archives) never share
+    an entry. Files parsed with a comment character are cached separately.
+    """
+    download_ID = os.path.basename(out_file)[len('hdock_'):-len('.out')]
+    path_hash = hashlib.sha1(os.path.abspath(out_file).encode('utf-8')).hexdigest()[:12]
+    key = f"{download_ID}__{path_hash}"
+    if comment is None:
+        return key
+    return f"{key}__c{ord(comment):02x}"
+
+def _replace_atomically(path, write):
+    """
+    Call write(f) on a uniquely named temp file next to path, then rename it over path.
+    Concurrent writers (pool workers, or two scripts sharing the cache) never share a temp file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def load_manifest(cache_folder):
+    """Load the cache manifest, or return an empty one if there is none (or it is unreadable)."""
+    manifest_path = os.path.join(cache_folder, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable cache manifest {manifest_path}: {e}")
+        return {}
+
+def save_manifest(cache_folder, manifest):
+    """Write the cache manifest atomically (temp file + rename)."""
+    os.makedirs(cache_folder, exist_ok=True)
+    manifest_path = os.path.join(cache_folder, MANIFEST_NAME)
+    _replace_atomically(manifest_path, lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+
+def cached_read_out_file(out_file, cache_folder, manifest, comment=None):
+    """
+    Return the parsed poses of an hdock_<download_ID>.out file, using the cache when possible.
+    The file is only re-parsed when its path, size or mtime differ from the manifest entry;
+    in that case the .npy file is rewritten and the manifest entry is updated in place
+    (call save_manifest once all files have been read).
+    """
+    basename = os.path.basename(out_file)
+    key = cache_key(out_file, comment)
+    npy_path = os.path.join(cache_folder, f"{key}.npy")
+
+    # For .out files read from an archive, the archive's size and mtime are tracked
+    stat = os.stat(source_path(out_file))
+    source = {
+        'path': os.path.abspath(out_file),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+
+    if manifest.get(key) == source and os.path.exists(npy_path):
+        try:
+            return np.load(npy_path)
+        except (OSError, ValueError) as e:
+            print(f"Re-parsing {basename}, cached copy is unreadable: {e}")
+
+    poses = read_out_file(out_file, comment=comment)
+
+    os.makedirs(cache_folder, exist_ok=True)
+    _replace_atomically(npy_path, lambda f: np.save(f, poses))
+    manifest[key] = source
+    return poses
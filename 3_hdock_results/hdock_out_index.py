@@ -0,0 +1,128 @@
+import os
+import json
+from hdock_archive_store import load_archive_index
+
+def scan_out_tree(base_folder):
+    """
+    Return (sorted .out paths, {folder relative to base_folder: st_mtime_ns}) for the
+    tree under base_folder, found in a single os.scandir walk (hidden files and
+    folders are skipped, as glob does). Each folder's mtime is taken before it is
+    listed, so a file added during the scan invalidates the saved index.
+    """
+    out_files = []
+    folder_mtimes = {}
+    stack = [base_folder]
+    while stack:
+        folder = stack.pop()
+        try:
+            folder_mtimes[os.path.relpath(folder, base_folder)] = os.stat(folder).st_mtime_ns
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.out'):
+                        out_files.append(entry.path)
+        except OSError as e:
+            print(f"Cannot scan {folder}: {e}")
+    return sorted(out_files), folder_mtimes
+
+def scan_out_files(base_folder):
+    """Return the sorted paths of all .out files under base_folder (see scan_out_tree)."""
+    return scan_out_tree(base_folder)[0]
+
+def index_out_files(out_files, duplicates=None):
+    """
+    Map every download_ID to its hdock_<download_ID>.out path.
+    If a download_ID appears more than once, the first path in sorted order is used
+    and every other one is reported (and appended to duplicates, if given), since
+    only one .out file per job gets a metrics row.
+    """
+    out_index = {}
+    for out_file in out_files:
+        basename = os.path.basename(out_file)
+        # Only index files that follow the expected naming convention
+        if not basename.startswith('hdock_'):
+            print(f"Skipping unexpected file: {basename}")
+            continue
+        download_ID = basename[len('hdock_'):-len('.out')]
+        if download_ID in out_index:
+            print(f"Duplicate .out file for download ID {download_ID}: using {out_index[download_ID]}, ignoring {out_file}")
+            if duplicates is not None:
+                duplicates.append(out_file)
+            continue
+        out_index[download_ID] = out_file
+    return out_index
+
+def build_out_index(base_folder):
+    """Map every download_ID under base_folder to its hdock_<download_ID>.out path."""
+    return index_out_files(scan_out_files(base_folder))
+
+def folders_unchanged(base_folder, folder_mtimes):
+    """True if every folder recorded by scan_out_tree still exists with the same mtime."""
+    for rel_folder, mtime_ns in folder_mtimes.items():
+        try:
+            if os.stat(os.path.join(base_folder, rel_folder)).st_mtime_ns != mtime_ns:
+                return False
+        except OSError:
+            return False
+    return True
+
+def save_out_index(index_path, base_folder, out_index, folder_mtimes, duplicates=()):
+    """
+    Persist the index (paths relative to base_folder) together with the mtime of every
+    folder in the tree and the duplicate .out files left out of it.
+    """
+    payload = {
+        'folder_mtimes': folder_mtimes,
+        'index': {download_ID: os.path.relpath(path, base_folder) for download_ID, path in out_index.items()},
+        'duplicates': [os.path.relpath(path, base_folder) for path in duplicates]
+    }
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, index_path)
+
+def load_out_index(base_folder, index_path=None, rebuild=False, archive_index_path=None):
+    """
+    Return the download_ID -> .out path index for base_folder.
+    If index_path is given, a persisted index is reused as long as no folder of the
+    tree changed its mtime (a job folder added or removed, or a .out file added,
+    removed or renamed inside a job folder); checking this costs one stat per folder
+    instead of a listing. Otherwise the tree is scanned once and the index is
+    written to index_path.
+    If archive_index_path is given, jobs that were not extracted are also looked up
+    in the *.tar.gz archives of base_folder and mapped to their .out member
+    (see hdock_archive_store); extracted files take precedence.
+    """
+    out_index = _load_extracted_index(base_folder, index_path, rebuild)
+    if archive_index_path:
+        for download_ID, source in load_archive_index(base_folder, archive_index_path).items():
+            out_index.setdefault(download_ID, source)
+    return out_index
+
+def _load_extracted_index(base_folder, index_path=None, rebuild=False):
+    """download_ID -> .out path index of the extracted files (see load_out_index)."""
+    if index_path and not rebuild and os.path.exists(index_path):
+        try:
+            with open(index_path, 'r') as f:
+                payload = json.load(f)
+            if 'folder_mtimes' in payload and folders_unchanged(base_folder, payload['folder_mtimes']):
+                out_index = {download_ID: os.path.join(base_folder, path) for download_ID, path in payload['index'].items()}
+                # Reported on every run, not only when the tree is scanned
+                for path in payload.get('duplicates', []):
+                    download_ID = os.path.basename(path)[len('hdock_'):-len('.out')]
+                    print(f"Duplicate .out file for download ID {download_ID}: using {out_index.get(download_ID)}, "
+                          f"ignoring {os.path.join(base_folder, path)}")
+                return out_index
+            print(f"{base_folder} has changed since the index was saved, rebuilding {index_path}")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable index {index_path}: {e}")
+
+    out_files, folder_mtimes = scan_out_tree(base_folder)
+    duplicates = []
+    out_index = index_out_files(out_files, duplicates)
+    if index_path:
+        save_out_index(index_path, base_folder, out_index, folder_mtimes, duplicates)
+    return out_index
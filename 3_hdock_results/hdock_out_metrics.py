@@ -0,0 +1,97 @@
+import numpy as np
+from hdock_out_reader import OUT_COLUMNS, iter_out_chunks, pose_matrix
+
+# ============================================================
+# Metric windows
+# ============================================================
+# avg<N> = mean of the first N values of a parameter. 'first' and 'avgAll'
+# are always computed; add cut-offs here (e.g. 5, 20, 500) to get new windows.
+PREFIX_CUTOFFS = [10, 100, 1000]
+# ============================================================
+
+def metric_names(prefix_cutoffs=PREFIX_CUTOFFS):
+    """Metric prefixes in output order: first, avg<N> for each cut-off, avgAll."""
+    return ['first'] + [f'avg{k}' for k in prefix_cutoffs] + ['avgAll']
+
+def prefix_means(matrix, prefix_cutoffs=PREFIX_CUTOFFS):
+    """
+    Compute all metrics for every column of a 2-D (n_poses x n_params) array.
+    NaN values are dropped per column, as series.dropna() did, so the n-th value
+    of a parameter is its n-th non-NaN value. A single cumulative-sum pass gives
+    every prefix sum; each cut-off then costs one binary search per column.
+    Returns a (len(metric_names) x n_params) array; columns without values are NaN.
+    """
+    n_cols = matrix.shape[1]
+    windows = [1] + list(prefix_cutoffs)
+    out = np.full((len(windows) + 1, n_cols), np.nan)
+    if len(matrix) == 0:
+        return out
+
+    valid = ~np.isnan(matrix)
+    counts = np.cumsum(valid, axis=0)
+    sums = np.cumsum(np.where(valid, matrix, 0.0), axis=0)
+
+    for j in range(n_cols):
+        total = counts[-1, j]
+        if total == 0:
+            continue
+        for m, k in enumerate(windows + [total]):
+            k = min(k, total)
+            # First row at which k values of this column have been seen
+            row = np.searchsorted(counts[:, j], k)
+            out[m, j] = sums[row, j] / k
+    return out
+
+def _metrics_dict(values, prefix_cutoffs):
+    """Turn a prefix_means result into a dict keyed '<metric>_<param>', parameter by parameter."""
+    names = metric_names(prefix_cutoffs)
+    result = {}
+    for j, param in enumerate(OUT_COLUMNS):
+        for m, name in enumerate(names):
+            result[f'{name}_{param}'] = values[m, j]
+    return result
+
+def pose_metrics(poses, prefix_cutoffs=PREFIX_CUTOFFS):
+    """
+    Return the metrics of a POSE_DTYPE array as a dict keyed '<metric>_<param>',
+    ordered parameter by parameter (first, avg<N>..., avgAll for each).
+    """
+    return _metrics_dict(prefix_means(pose_matrix(poses), prefix_cutoffs), prefix_cutoffs)
+
+def stream_out_metrics(out_file, prefix_cutoffs=PREFIX_CUTOFFS, chunk_lines=50000, comment=None):
+    """
+    Same result as pose_metrics(read_out_file(out_file)), but the file is read in
+    chunks of chunk_lines lines. Only the first values of each column needed for
+    the largest cut-off are kept (at most max(prefix_cutoffs) per column); avgAll
+    comes from running per-column sums and counts, so memory stays bounded however
+    many poses the file holds.
+    """
+    keep = max([1] + list(prefix_cutoffs))
+    n_cols = len(OUT_COLUMNS)
+    # First `keep` non-NaN values of each column; a column that is complete stops
+    # collecting, so a column with few values cannot make the others grow unbounded
+    head_values = [[] for _ in range(n_cols)]
+    head_counts = np.zeros(n_cols, dtype=np.int64)
+    total_sums = np.zeros(n_cols)
+    total_counts = np.zeros(n_cols, dtype=np.int64)
+
+    for chunk in iter_out_chunks(out_file, chunk_lines=chunk_lines, comment=comment):
+        matrix = pose_matrix(chunk)
+        valid = ~np.isnan(matrix)
+        total_sums += np.where(valid, matrix, 0.0).sum(axis=0)
+        total_counts += valid.sum(axis=0)
+        for j in np.flatnonzero(head_counts < keep):
+            values = matrix[valid[:, j], j][:keep - head_counts[j]]
+            if len(values):
+                head_values[j].append(values.copy())
+                head_counts[j] += len(values)
+
+    # Column j holds its leading values followed by NaN padding, which prefix_means skips
+    head = np.full((int(head_counts.max(initial=0)), n_cols), np.nan)
+    for j, chunks in enumerate(head_values):
+        if chunks:
+            head[:head_counts[j], j] = np.concatenate(chunks)
+    values = prefix_means(head, prefix_cutoffs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values[-1] = np.where(total_counts > 0, total_sums / total_counts, np.nan)
+    return _metrics_dict(values, prefix_cutoffs)
@@ -0,0 +1,93 @@
+from itertools import chain, islice
+import numpy as np
+from hdock_archive_store import open_out_source
+
+# ============================================================
+# HDOCK .out format
+# ============================================================
+# Columns expected in the pose lines of an hdock_<download_ID>.out file
+OUT_COLUMNS = [
+    "Translation_X", "Translation_Y", "Translation_Z",
+    "Rotation_X", "Rotation_Y", "Rotation_Z",
+    "Binding_Score", "RMSD", "Translational_ID"
+]
+
+# One record per pose; every field is float64 so that missing or
+# non-numeric values can be stored as NaN (same as pd.to_numeric(errors='coerce')).
+POSE_DTYPE = np.dtype([(col, np.float64) for col in OUT_COLUMNS])
+# ============================================================
+
+def _coerce_float(token):
+    """Convert one field to float, returning NaN for non-numeric values."""
+    try:
+        return float(token)
+    except ValueError:
+        return np.nan
+
+def parse_out_lines(lines, comment=None):
+    """
+    Parse the lines of an HDOCK .out file into a POSE_DTYPE structured array.
+    Lines are handled the same way as pd.read_csv(sep='\\s+', header=None,
+    names=OUT_COLUMNS, engine='python', on_bad_lines='skip'):
+        - blank lines are skipped
+        - if comment is given, text after it is dropped and full comment lines are skipped
+        - lines with more than nine fields are bad lines and are skipped
+        - shorter lines (e.g. the header lines) are padded with NaN
+        - non-numeric fields become NaN
+    """
+    n_cols = len(OUT_COLUMNS)
+    rows = []
+    full_idx = []
+    for line in lines:
+        if comment is not None:
+            line = line.split(comment, 1)[0]
+        fields = line.split()
+        if fields and len(fields) <= n_cols:
+            if len(fields) == n_cols:
+                full_idx.append(len(rows))
+            rows.append(fields)
+
+    data = np.full((len(rows), n_cols), np.nan, dtype=np.float64)
+
+    # Fast path: the pose lines are complete, fully numeric rows that numpy
+    # converts in a single call. Anything else falls back to per-field coercion.
+    converted = False
+    if full_idx:
+        flat = list(chain.from_iterable(rows[i] for i in full_idx))
+        try:
+            data[full_idx] = np.array(flat, dtype=np.float64).reshape(-1, n_cols)
+            converted = True
+        except ValueError:
+            pass
+
+    for i, fields in enumerate(rows):
+        if converted and len(fields) == n_cols:
+            continue
+        data[i, :len(fields)] = [_coerce_float(token) for token in fields]
+
+    return data.view(POSE_DTYPE).reshape(-1)
+
+def read_out_file(out_file, comment=None):
+    """
+    Read an hdock_<download_ID>.out file into a POSE_DTYPE structured array
+    with one record per parsed line (see parse_out_lines). out_file may also be
+    an archive member source (see hdock_archive_store).
+    """
+    with open_out_source(out_file) as f:
+        return parse_out_lines(f.read().splitlines(), comment=comment)
+
+def iter_out_chunks(out_file, chunk_lines=50000, comment=None):
+    """
+    Yield the poses of an .out file as POSE_DTYPE arrays of at most chunk_lines
+    parsed lines each, so that only one chunk of the file is in memory at a time.
+    """
+    with open_out_source(out_file) as f:
+        while True:
+            lines = list(islice(f, chunk_lines))
+            if not lines:
+                break
+            yield parse_out_lines(lines, comment=comment)
+
+def pose_matrix(poses):
+    """Return the poses as a 2-D (n_poses x 9) float64 view, without copying."""
+    return poses.view(np.float64).reshape(len(poses), len(OUT_COLUMNS))
@@ -0,0 +1,117 @@
+import os
+import importlib
+import numpy as np
+import pandas as pd
+
+parameters = importlib.import_module("2_parameters")
+
+
+def write_out_file(path, n_poses, rng):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write("  0.600000     15\nreceptor.pdb\nligand.pdb\n  1.0 2.0 3.0\n  4.0 5.0 6.0\n")
+        for _ in range(n_poses):
+            values = [f"{v:.3f}" for v in rng.uniform(-50, 50, size=8)] + [str(rng.integers(1, 60000))]
+            f.write("  ".join(values) + "\n")
+
+
+def make_jobs(base, n_jobs, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(n_jobs):
+        write_out_file(os.path.join(base, f"job{i:02d}", f"hdock_job{i:02d}.out"), int(rng.integers(5, 1500)), rng)
+
+
+def csv_bytes(df, path):
+    df.to_csv(path, index=False)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_pool_output_is_byte_identical_to_serial(tmp_path):
+    base = str(tmp_path / "hdock_output")
+    make_jobs(base, 12)
+
+    serial = parameters.process_out_files(base, workers=1)
+    pooled = parameters.process_out_files(base, workers=3)
+
+    assert len(serial) == 12
+    assert csv_bytes(serial, tmp_path / "serial.csv") == csv_bytes(pooled, tmp_path / "pooled.csv")
+
+
+def test_pool_with_cache_is_byte_identical_to_serial(tmp_path):
+    base = str(tmp_path / "hdock_output")
+    make_jobs(base, 12, seed=1)
+    serial = parameters.process_out_files(base, workers=1)
+
+    # Cold cache, then warm cache
+    for _ in range(2):
+        pooled = parameters.process_out_files(base, cache_folder=str(tmp_path / "cache"), workers=3)
+        assert csv_bytes(serial, tmp_path / "serial.csv") == csv_bytes(pooled, tmp_path / "pooled.csv")
+
+
+def full_rebuild_bytes(base, tmp_path):
+    df = parameters.update_out_metrics(base, str(tmp_path / "full.csv"), str(tmp_path / "full_state.json"),
+                                       full_rebuild=True, workers=1)
+    return csv_bytes(df, tmp_path / "full_check.csv")
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path):
+    base = str(tmp_path / "hdock_output")
+    make_jobs(base, 6)
+    metrics_csv = str(tmp_path / "metrics.csv")
+    state_path = str(tmp_path / "state.json")
+
+    def incremental():
+        df = parameters.update_out_metrics(base, metrics_csv, state_path, workers=1)
+        with open(metrics_csv, 'rb') as f:
+            written = f.read()
+        assert written == csv_bytes(df, tmp_path / "returned.csv")
+        return written, set(df['download_ID'])
+
+    incremental()
+    rng = np.random.default_rng(2)
+
+    # New job
+    write_out_file(os.path.join(base, "job99", "hdock_job99.out"), 40, rng)
+    written, ids = incremental()
+    assert "job99" in ids
+    assert written == full_rebuild_bytes(base, tmp_path)
+
+    # Modified job: new content, different size and mtime_ns
+    modified = os.path.join(base, "job03", "hdock_job03.out")
+    write_out_file(modified, 77, rng)
+    os.utime(modified, ns=(1, 1))
+    written, ids = incremental()
+    assert written == full_rebuild_bytes(base, tmp_path)
+
+    # Modified with the same size, only mtime_ns changes
+    with open(modified, 'r+') as f:
+        f.seek(os.path.getsize(modified) - 4)
+        f.write("123\n")
+    os.utime(modified, ns=(2, 2))
+    written, ids = incremental()
+    assert written == full_rebuild_bytes(base, tmp_path)
+
+    # Deleted job
+    os.remove(os.path.join(base, "job01", "hdock_job01.out"))
+    written, ids = incremental()
+    assert "job01" not in ids
+    assert written == full_rebuild_bytes(base, tmp_path)
+
+
+def test_incremental_update_processes_only_changed_jobs(tmp_path, monkeypatch):
+    base = str(tmp_path / "hdock_output")
+    make_jobs(base, 4)
+    metrics_csv = str(tmp_path / "metrics.csv")
+    state_path = str(tmp_path / "state.json")
+    parameters.update_out_metrics(base, metrics_csv, state_path, workers=1)
+
+    processed = []
+    extract = parameters.extract_out_metrics
+    monkeypatch.setattr(parameters, "extract_out_metrics", lambda out_file, *args: processed.append(out_file) or extract(out_file, *args))
+    changed = os.path.join(base, "job02", "hdock_job02.out")
+    write_out_file(changed, 10, np.random.default_rng(3))
+
+    parameters.update_out_metrics(base, metrics_csv, state_path, workers=1)
+    assert processed == [changed]
+    assert pd.read_csv(metrics_csv, dtype={'download_ID': str})['download_ID'].tolist() == [f"job{i:02d}" for i in range(4)]
@@ -0,0 +1,33 @@
+import importlib
+import numpy as np
+import pandas as pd
+import pytest
+
+parameter_plots = importlib.import_module("4_PARAMETERS_first_50plots")
+
+
+def make_frame(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for j in range(6):
+        # Few distinct values so there are many ties, and ~20% NaN
+        column = rng.integers(-5, 5, size=n_rows).astype(np.float64)
+        column[rng.random(n_rows) < 0.2] = np.nan
+        columns[f"col{j}"] = column
+    columns["all_nan"] = np.full(n_rows, np.nan)
+    columns["no_nan"] = rng.integers(0, 3, size=n_rows).astype(np.float64)
+    # A non-default index: selections are row positions, not labels
+    return pd.DataFrame(columns, index=rng.permutation(n_rows) + 1000)
+
+
+@pytest.mark.parametrize("n_rows, k", [(200, 50), (200, 1), (30, 50), (60, 48), (0, 5), (10, 0)])
+def test_matches_stable_sort_head(n_rows, k):
+    df = make_frame(n_rows, seed=n_rows + k)
+    col_names = list(df.columns)
+
+    selections = parameter_plots.select_top_k(df, col_names, k)
+
+    positions = pd.Series(np.arange(n_rows), index=df.index)
+    for col_name in col_names:
+        expected = df.sort_values(col_name, kind='stable').head(k).index
+        assert selections[col_name].tolist() == positions[expected].tolist(), col_name
@@ -0,0 +1,63 @@
+import io
+import os
+import tarfile
+import hdock_archive_store
+from hdock_archive_store import load_archive_index, split_archive_source
+from hdock_out_reader import parse_out_lines, read_out_file
+
+OUT_TEXT = "  0.600000     15\nreceptor.pdb\nligand.pdb\n" + "".join(
+    "  ".join(f"{i + j:.3f}" for j in range(9)) + "\n" for i in range(50)
+)
+
+
+def write_archive(path, members):
+    with tarfile.open(path, "w:gz") as tar:
+        for name, text in members.items():
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def test_members_are_read_without_the_archive(tmp_path):
+    base = str(tmp_path / "out")
+    os.makedirs(base)
+    # Nested in a job folder, and at the top level of the tar
+    write_archive(os.path.join(base, "job1.tar.gz"), {"job1/model_1.pdb": "ATOM\n", "job1/hdock_job1.out": OUT_TEXT})
+    write_archive(os.path.join(base, "job2.tar.gz"), {"hdock_job2.out": OUT_TEXT})
+    index_path = str(tmp_path / "archive_index.json")
+
+    archive_index = load_archive_index(base, index_path)
+
+    assert sorted(archive_index) == ["job1", "job2"]
+    expected = parse_out_lines(OUT_TEXT.splitlines())
+    for download_ID, source in archive_index.items():
+        assert os.path.basename(source) == f"hdock_{download_ID}.out"
+        assert read_out_file(source).tobytes() == expected.tobytes()
+
+
+def test_member_with_another_download_ID_is_rejected(tmp_path):
+    base = str(tmp_path / "out")
+    os.makedirs(base)
+    # A top-level .out named after another job must not be filed under that job
+    write_archive(os.path.join(base, "job1.tar.gz"), {"hdock_job9.out": OUT_TEXT})
+
+    assert load_archive_index(base, str(tmp_path / "archive_index.json")) == {}
+
+
+def test_unchanged_archives_are_not_reread_and_removed_ones_are_pruned(tmp_path, monkeypatch):
+    base = str(tmp_path / "out")
+    os.makedirs(base)
+    write_archive(os.path.join(base, "job1.tar.gz"), {"job1/hdock_job1.out": OUT_TEXT})
+    write_archive(os.path.join(base, "job2.tar.gz"), {"job2/hdock_job2.out": OUT_TEXT})
+    index_path = str(tmp_path / "archive_index.json")
+    member_copy = split_archive_source(load_archive_index(base, index_path)["job2"])[1]
+    assert os.path.exists(member_copy)
+
+    def fail(*args):
+        raise AssertionError("archive re-read")
+    monkeypatch.setattr(hdock_archive_store, "index_archive", fail)
+    os.remove(os.path.join(base, "job2.tar.gz"))
+
+    assert sorted(load_archive_index(base, index_path)) == ["job1"]
+    assert not os.path.exists(member_copy)
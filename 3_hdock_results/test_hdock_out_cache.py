@@ -0,0 +1,47 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from hdock_out_cache import cache_key, cached_read_out_file, load_manifest, save_manifest
+
+
+def write_out_file(path, n_poses, offset=0.0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write("  0.600000     15\nreceptor.pdb\nligand.pdb\n  1.0 2.0 3.0\n  4.0 5.0 6.0\n")
+        for i in range(n_poses):
+            f.write("  ".join(f"{offset + i + j:.3f}" for j in range(9)) + "\n")
+
+
+def test_same_download_ID_in_two_places_is_cached_separately(tmp_path):
+    cache_folder = str(tmp_path / "cache")
+    first = str(tmp_path / "a" / "job1" / "hdock_job1.out")
+    second = str(tmp_path / "b" / "job1" / "hdock_job1.out")
+    write_out_file(first, 5)
+    write_out_file(second, 8, offset=100.0)
+    assert cache_key(first) != cache_key(second)
+
+    manifest = {}
+    assert len(cached_read_out_file(first, cache_folder, manifest)) == 5 + 5
+    assert len(cached_read_out_file(second, cache_folder, manifest)) == 8 + 5
+    save_manifest(cache_folder, manifest)
+    assert sorted(os.listdir(cache_folder)) == sorted([f"{cache_key(first)}.npy", f"{cache_key(second)}.npy", "manifest.json"])
+
+    # Both are served from the cache (header lines count as NaN rows, as in the reader)
+    manifest = load_manifest(cache_folder)
+    assert len(cached_read_out_file(first, cache_folder, manifest)) == 5 + 5
+    assert len(cached_read_out_file(second, cache_folder, manifest)) == 8 + 5
+
+
+def test_concurrent_writers_do_not_share_a_temp_file(tmp_path):
+    cache_folder = str(tmp_path / "cache")
+    out_file = str(tmp_path / "job1" / "hdock_job1.out")
+    write_out_file(out_file, 2000)
+
+    # Every call misses (fresh manifest) and rewrites the same .npy file
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cached_read_out_file(out_file, cache_folder, {}), range(16)))
+
+    assert all(result.tobytes() == results[0].tobytes() for result in results)
+    # Only the final .npy is left: no temp file was clobbered or leaked
+    assert os.listdir(cache_folder) == [f"{cache_key(out_file)}.npy"]
+    assert np.load(os.path.join(cache_folder, f"{cache_key(out_file)}.npy")).tobytes() == results[0].tobytes()
@@ -0,0 +1,59 @@
+import os
+from hdock_out_index import load_out_index
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write("0.6 15\n")
+
+
+def test_saved_index_is_reused_while_tree_unchanged(tmp_path):
+    base = str(tmp_path / "ligands")
+    touch(os.path.join(base, "job_a", "hdock_a.out"))
+    index_path = str(tmp_path / "index.json")
+
+    assert set(load_out_index(base, index_path)) == {"a"}
+    # Tamper with the saved index: an unchanged tree means it is read back as is
+    with open(index_path) as f:
+        saved = f.read()
+    with open(index_path, 'w') as f:
+        f.write(saved.replace('"a"', '"cached_a"'))
+    assert set(load_out_index(base, index_path)) == {"cached_a"}
+
+
+def test_new_out_file_in_existing_job_folder_is_found(tmp_path):
+    base = str(tmp_path / "ligands")
+    touch(os.path.join(base, "job_a", "hdock_a.out"))
+    index_path = str(tmp_path / "index.json")
+    assert set(load_out_index(base, index_path)) == {"a"}
+    base_mtime = os.stat(base).st_mtime_ns
+
+    touch(os.path.join(base, "job_a", "hdock_b.out"))
+
+    # The job folder changed, its parent did not
+    assert os.stat(base).st_mtime_ns == base_mtime
+    assert set(load_out_index(base, index_path)) == {"a", "b"}
+
+
+def test_new_nested_folder_is_found(tmp_path):
+    base = str(tmp_path / "ligands")
+    touch(os.path.join(base, "job_a", "hdock_a.out"))
+    index_path = str(tmp_path / "index.json")
+    load_out_index(base, index_path)
+
+    touch(os.path.join(base, "job_a", "models", "hdock_c.out"))
+
+    assert set(load_out_index(base, index_path)) == {"a", "c"}
+
+
+def test_duplicate_download_IDs_are_reported_on_every_run(tmp_path, capsys):
+    base = str(tmp_path / "ligands")
+    touch(os.path.join(base, "batch1", "job_a", "hdock_a.out"))
+    touch(os.path.join(base, "batch2", "job_a", "hdock_a.out"))
+    index_path = str(tmp_path / "index.json")
+
+    for _ in range(2):
+        # First run scans the tree, second reuses the saved index
+        assert load_out_index(base, index_path) == {"a": os.path.join(base, "batch1", "job_a", "hdock_a.out")}
+        assert f"ignoring {os.path.join(base, 'batch2', 'job_a', 'hdock_a.out')}" in capsys.readouterr().out
@@ -0,0 +1,33 @@
+import numpy as np
+from hdock_out_reader import read_out_file
+from hdock_out_metrics import pose_metrics, stream_out_metrics
+
+
+def write_out_file(path, n_poses, sparse_last_column, rng):
+    """HDOCK-like .out file; with sparse_last_column, only every 7th pose has a trans_id."""
+    with open(path, 'w') as f:
+        f.write("  0.600000     15\nreceptor.pdb\nligand.pdb\n  1.0 2.0 3.0\n  4.0 5.0 6.0\n")
+        for i in range(n_poses):
+            values = [f"{v:.3f}" for v in rng.uniform(-50, 50, size=9)] + [str(rng.integers(1, 60000))]
+            if sparse_last_column and i % 7:
+                values = values[:-1]
+            f.write("  ".join(values) + "\n")
+
+
+def assert_same_metrics(expected, actual):
+    assert expected.keys() == actual.keys()
+    for key in expected:
+        assert np.isclose(expected[key], actual[key], equal_nan=True), key
+
+
+def test_streaming_matches_full_read(tmp_path):
+    path = str(tmp_path / "hdock_a.out")
+    write_out_file(path, 3000, sparse_last_column=False, rng=np.random.default_rng(0))
+    assert_same_metrics(pose_metrics(read_out_file(path)), stream_out_metrics(path, chunk_lines=97))
+
+
+def test_column_below_largest_cutoff(tmp_path):
+    # The last column has ~430 values, fewer than the 1000 of avg1000: it never completes
+    path = str(tmp_path / "hdock_b.out")
+    write_out_file(path, 3000, sparse_last_column=True, rng=np.random.default_rng(1))
+    assert_same_metrics(pose_metrics(read_out_file(path)), stream_out_metrics(path, chunk_lines=97))
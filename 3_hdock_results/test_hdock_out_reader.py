@@ -0,0 +1,53 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from hdock_out_reader import OUT_COLUMNS, parse_out_lines, pose_matrix, read_out_file
+
+MALFORMED_OUT = (
+    "  0.600000     15\n"
+    "receptor.pdb\n"
+    "ligand.pdb\n"
+    "\n"
+    "  1.0 2.0 3.0\n"
+    "  4.0 5.0 6.0\n"
+    "  1.1 2.2 3.3 0.1 0.2 0.3 -250.5 12.0 4021\n"
+    # More than nine fields: a bad line, dropped
+    "  1.1 2.2 3.3 0.1 0.2 0.3 -250.5 12.0 4021 99 100\n"
+    "  1.1 2.2 3.3 0.1 0.2 0.3 -249.0 13.5 4022 extra\n"
+    # Short rows: padded with NaN
+    "  7.0 8.0\n"
+    "  7.0 8.0 9.0 1.0 2.0 3.0 -240.0\n"
+    # Non-numeric fields become NaN
+    "  1.0 abc 3.0 0.1 0.2 0.3 -230.0 n/a 4023\n"
+    "   \t  \n"
+    "  2.0 2.0 2.0 0.2 0.2 0.2 -220.0 14.0 4024   \n"
+    "  # a comment line\n"
+    "  3.0 3.0 3.0 0.3 0.3 0.3 -210.0 15.0 4025 # trailing comment\n"
+    "\n"
+    "\n"
+    "  4.0 4.0 4.0 0.4 0.4 0.4 -200.0 16.0 4026"
+)
+
+
+def read_csv_baseline(text, comment=None):
+    """The reader the parser replaced, made numeric the way the metrics code did."""
+    df = pd.read_csv(io.StringIO(text), sep=r'\s+', header=None, names=OUT_COLUMNS, engine='python',
+                     on_bad_lines='skip', comment=comment)
+    return df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+
+@pytest.mark.parametrize("comment", [None, '#'])
+def test_malformed_lines_match_read_csv(comment):
+    expected = read_csv_baseline(MALFORMED_OUT, comment)
+    actual = pose_matrix(parse_out_lines(MALFORMED_OUT.splitlines(), comment=comment))
+    assert actual.shape == expected.shape
+    assert np.array_equal(actual, expected, equal_nan=True)
+
+
+def test_file_with_trailing_blank_lines_matches_read_csv(tmp_path):
+    path = tmp_path / "hdock_x.out"
+    path.write_text(MALFORMED_OUT + "\n\n   \n")
+    with open(path) as f:
+        expected = read_csv_baseline(f.read())
+    assert np.array_equal(pose_matrix(read_out_file(str(path))), expected, equal_nan=True)